@@ -0,0 +1,213 @@
+import os
+import time
+import queue
+import atexit
+import smtplib
+import logging
+import threading
+from collections import deque
+from email.mime.text import MIMEText
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger("alerts")
+
+# Alerts arriving within this many seconds of the first one go out as one email
+COALESCE_SECONDS = float(os.getenv('ALERT_COALESCE_SECONDS', 2))
+# Upper bound on alerts merged into one email
+MAX_ALERTS_PER_MESSAGE = 50
+# Latencies kept for the stats
+LATENCY_SAMPLES = 1000
+
+class SMTPTransport:
+    """
+    One SMTP connection kept open across sends. It is opened and logged in
+    on first use, and reopened once when a send finds it dropped.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self._server = None
+
+    def _connect(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.username:
+            server.login(self.username, self.password)
+        self._server = server
+        log.info(f"Connected to SMTP server {self.host}:{self.port}")
+
+    def send(self, msg):
+        if self._server is None:
+            self._connect()
+        try:
+            self._server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+            log.warning(f"SMTP connection lost ({e}), reconnecting")
+            self.close()
+            self._connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
+
+class LogTransport:
+    """Logs the emails instead of sending them, used when no SMTP account is configured."""
+
+    def send(self, msg):
+        log.info(f"Alert email to {msg['To']}: {msg['Subject']}\n{msg.get_payload()}")
+
+    def close(self):
+        pass
+
+class AlertDispatcher:
+    """
+    Sends alert emails from a background thread so callers never wait on
+    SMTP. Alerts queued within coalesce_seconds of each other are merged
+    into one email. The transport is anything with send(msg) and close().
+    """
+
+    def __init__(self, transport, sender, recipients, coalesce_seconds=COALESCE_SECONDS, max_alerts=MAX_ALERTS_PER_MESSAGE):
+        self.transport = transport
+        self.sender = sender
+        self.recipients = recipients
+        self.coalesce_seconds = coalesce_seconds
+        self.max_alerts = max_alerts
+
+        self.alerts_sent = 0
+        self.messages_sent = 0
+        self.alerts_failed = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._stats_lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def send(self, subject, body):
+        """Queue an alert and return straight away."""
+        if self._closed:
+            log.error(f"Alert dispatcher is closed, dropping alert {subject!r}")
+            return
+        self._queue.put((subject, body, time.perf_counter()))
+
+    def _collect(self, first):
+        # Wait out the coalescing window measured from the first alert
+        batch = [first]
+        deadline = first[2] + self.coalesce_seconds
+        while len(batch) < self.max_alerts:
+            remaining = deadline - time.perf_counter()
+            try:
+                alert = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if alert is None:
+                self._queue.put(None)
+                break
+            batch.append(alert)
+        return batch
+
+    def _message(self, batch):
+        if len(batch) == 1:
+            subject, body, _ = batch[0]
+        else:
+            subject = f"{len(batch)} alerts: {batch[0][0]}"
+            body = "\n\n".join(f"{alert_subject}\n{alert_body}" for alert_subject, alert_body, _ in batch)
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = ", ".join(self.recipients)
+        return msg
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                self.transport.send(self._message(batch))
+            except Exception as e:
+                log.error(f"Failed to send {len(batch)} alerts: {e}")
+                with self._stats_lock:
+                    self.alerts_failed += len(batch)
+                continue
+
+            sent = time.perf_counter()
+            with self._stats_lock:
+                self.messages_sent += 1
+                self.alerts_sent += len(batch)
+                self._latencies.extend(sent - enqueued for _, _, enqueued in batch)
+
+    def stats(self):
+        """Counts plus enqueue-to-send latency percentiles (seconds) over recent alerts."""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'alerts_sent': self.alerts_sent,
+                'messages_sent': self.messages_sent,
+                'alerts_failed': self.alerts_failed,
+                'queued': self._queue.qsize(),
+            }
+        if latencies:
+            stats.update(
+                latency_p50=latencies[len(latencies) // 2],
+                latency_p95=latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+                latency_max=latencies[-1],
+            )
+        return stats
+
+    def close(self, timeout=30):
+        """Send whatever is queued, then stop the thread and close the transport."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.transport.close()
+
+def transport_from_env():
+    username = os.getenv('ALERT_SMTP_USER')
+    if not username:
+        return LogTransport()
+    return SMTPTransport(
+        host=os.getenv('ALERT_SMTP_HOST', "smtp.gmail.com"),
+        port=int(os.getenv('ALERT_SMTP_PORT', 465)),
+        username=username,
+        password=os.getenv('ALERT_SMTP_PASSWORD'),
+        use_ssl=os.getenv('ALERT_SMTP_SSL', "true").lower() != "false",
+    )
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_alert_dispatcher():
+    """Process wide dispatcher configured from the ALERT_* environment variables."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                sender = os.getenv('ALERT_SENDER') or os.getenv('ALERT_SMTP_USER') or "alerts@localhost"
+                recipients = [r.strip() for r in os.getenv('ALERT_RECIPIENTS', sender).split(",") if r.strip()]
+                _dispatcher = AlertDispatcher(transport_from_env(), sender, recipients)
+                # Flush queued alerts when the process exits
+                atexit.register(_dispatcher.close)
+    return _dispatcher
+
+def send_alert(subject, body):
+    get_alert_dispatcher().send(subject, body)
@@ -1,33 +1,145 @@
 ﻿import os
+import time
 import logging
+import threading
 from dotenv import load_dotenv
-from breeze_connect import BreezeConnect
 import pytz
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
 from rich.logging import RichHandler
+from api.breeze.rate_limiter import historical_rate_limiter
+from api.breeze import recorder
+from api.breeze.session_token import session_tokens
+from api.metrics import metrics
 
 load_dotenv()
 
 log = logging.getLogger("breeze_api")
 console = Console()
 
+# Breeze reports an expired or invalid session in the response body rather than raising
+SESSION_ERROR_MARKERS = ("session", "unauthori")
+THROTTLE_ERROR_MARKERS = ("limit", "too many")
+
+# Breeze returns at most this many candles from one get_historical_data_v2 call
+MAX_CANDLES_PER_CALL = 1000
+# NSE trading session is 09:15 to 15:30
+SESSION_MINUTES = 375
+INTERVAL_MINUTES = {
+    "1second": 1 / 60,
+    "1minute": 1,
+    "5minute": 5,
+    "30minute": 30,
+    "1day": SESSION_MINUTES,
+}
+# Parallel calls used for the chunks of a single long range
+CHUNK_WORKERS = 4
+
 class BreezeAPI:
     def __init__(self):
         self.api_key = os.getenv('BREEZE_API_KEY')
         self.api_secret = os.getenv('BREEZE_API_SECRET')
-        self.session_id = os.getenv('BREEZE_SESSION_ID')
+        self.session_id = None
+        self.session_tokens = session_tokens
         self.breeze = None
+        self._connect_lock = threading.Lock()
+        self.rate_limiter = historical_rate_limiter
+        self.transport = recorder.transport_mode()
 
     def connect(self):
+        if self.transport == recorder.REPLAY:
+            self.breeze = recorder.ReplayClient(recorder.RecordingStore())
+            log.info("Replaying recorded Breeze API responses")
+            return
+
+        # Imported here, breeze_connect is slow to load and replay never needs it
+        from breeze_connect import BreezeConnect
+
         try:
-            self.breeze = BreezeConnect(api_key=self.api_key)
-            self.breeze.generate_session(api_secret=self.api_secret, session_token=self.session_id)
-            log.info("Connected to Breeze API")
+            # Cached on disk and refreshed in the background when auto login is configured
+            self.session_id = self.session_tokens.get_token()
+            breeze = BreezeConnect(api_key=self.api_key)
+            breeze.generate_session(api_secret=self.api_secret, session_token=self.session_id)
+            if self.transport == recorder.RECORD:
+                breeze = recorder.RecordingClient(breeze, recorder.RecordingStore())
+            self.breeze = breeze
+            log.info(f"Connected to Breeze API ({self.transport})")
         except Exception as e:
             log.error(f"Failed to connect to Breeze API: {e}")
             raise
 
+    def reconnect(self, stale_client=None):
+        # Threads that saw the same expired client only trigger one new session
+        with self._connect_lock:
+            if stale_client is not None and self.breeze is not stale_client:
+                return
+            log.warning("Breeze session expired, reconnecting")
+            self.session_tokens.invalidate(self.session_id)
+            self.connect()
+
+    def _on_new_session_token(self, session_token):
+        # The refresher logged in again ahead of expiry, move over before the old session dies
+        if self.breeze is not None and session_token != self.session_id:
+            self.reconnect(stale_client=self.breeze)
+
+    @staticmethod
+    def _is_session_error(data):
+        if not isinstance(data, dict) or data.get('Status') in (None, 200):
+            return False
+        error = str(data.get('Error') or "").lower()
+        return data.get('Status') == 401 or any(marker in error for marker in SESSION_ERROR_MARKERS)
+
+    @staticmethod
+    def _is_throttled(data):
+        if not isinstance(data, dict) or data.get('Status') in (None, 200):
+            return False
+        error = str(data.get('Error') or "").lower()
+        return data.get('Status') == 429 or any(marker in error for marker in THROTTLE_ERROR_MARKERS)
+
+    @classmethod
+    def _is_transient(cls, data):
+        if not isinstance(data, dict):
+            return False
+        status = data.get('Status')
+        return isinstance(status, int) and status >= 500 and not cls._is_session_error(data)
+
+    def _timed_historical_call(self, client, params):
+        if not metrics.enabled:
+            return client.get_historical_data_v2(**params)
+
+        product_type = str(params.get('product_type')).lower()
+        started = time.perf_counter()
+        try:
+            data = client.get_historical_data_v2(**params)
+        except Exception:
+            metrics.inc("breeze_historical_calls", product_type=product_type, status="exception")
+            raise
+        finally:
+            metrics.observe("breeze_historical_call_seconds", time.perf_counter() - started, product_type=product_type)
+        status = data.get('Status') if isinstance(data, dict) else None
+        metrics.inc("breeze_historical_calls", product_type=product_type, status=str(status))
+        if status not in (None, 200):
+            metrics.inc("breeze_historical_errors", product_type=product_type)
+        return data
+
+    def _get_historical_data(self, **params):
+        # Recordings are local, nothing to limit or retry
+        if self.transport == recorder.REPLAY:
+            return self._timed_historical_call(self.breeze, params)
+
+        # All historical calls share one rate limiter and retry throttled or transient failures
+        def call():
+            client = self.breeze
+            data = self._timed_historical_call(client, params)
+            if self._is_session_error(data):
+                self.reconnect(stale_client=client)
+                self.rate_limiter.acquire()
+                data = self._timed_historical_call(self.breeze, params)
+            return data
+
+        return self.rate_limiter.call(call, self._is_throttled, self._is_transient)
+
     def _format_date(self, date):
         if isinstance(date, str):
             date = datetime.strptime(date, "%Y-%m-%d")
@@ -38,24 +150,76 @@ class BreezeAPI:
         # Format to the specific string format required by the API
         return utc_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
 
+    def _to_datetime(self, date):
+        if isinstance(date, str):
+            return datetime.strptime(date, "%Y-%m-%d")
+        return date
+
+    def _chunk_date_range(self, from_date, to_date, interval):
+        interval_minutes = INTERVAL_MINUTES.get(interval, 1)
+        candles_per_day = SESSION_MINUTES / interval_minutes + 1
+        if candles_per_day <= MAX_CANDLES_PER_CALL:
+            chunk = timedelta(days=int(MAX_CANDLES_PER_CALL // candles_per_day))
+        else:
+            chunk = timedelta(minutes=MAX_CANDLES_PER_CALL * interval_minutes)
+
+        # Neighbouring chunks share their boundary so no candle falls between them
+        chunks = []
+        chunk_from = from_date
+        while True:
+            chunk_to = min(chunk_from + chunk, to_date)
+            chunks.append((chunk_from, chunk_to))
+            if chunk_to >= to_date:
+                return chunks
+            chunk_from = chunk_to
+
+    def _merge_chunks(self, responses):
+        for data in responses:
+            if not data or data.get('Status') not in (None, 200):
+                return data
+
+        candles = {}
+        for data in responses:
+            for candle in data.get('Success') or []:
+                candles[candle['datetime']] = candle
+        return {'Success': [candles[key] for key in sorted(candles)], 'Status': 200, 'Error': None}
+
+    def _get_historical_data_chunked(self, from_date, to_date, interval, **params):
+        chunks = self._chunk_date_range(self._to_datetime(from_date), self._to_datetime(to_date), interval)
+
+        def fetch_chunk(chunk):
+            chunk_from, chunk_to = chunk
+            return self._get_historical_data(
+                interval=interval,
+                from_date=self._format_date(chunk_from),
+                to_date=self._format_date(chunk_to),
+                **params
+            )
+
+        if len(chunks) == 1:
+            return fetch_chunk(chunks[0])
+
+        log.debug(f"Splitting {from_date} to {to_date} into {len(chunks)} chunks")
+        with ThreadPoolExecutor(max_workers=min(CHUNK_WORKERS, len(chunks))) as executor:
+            responses = list(executor.map(fetch_chunk, chunks))
+        return self._merge_chunks(responses)
+
     def get_futures_data(self, stock_code, from_date, to_date, interval="5minute", expiry_date=None):
         if not self.breeze:
             log.error("Not connected to Breeze API. Call connect() first.")
             raise Exception("Not connected to Breeze API. Call connect() first.")
 
         try:
-            # Convert dates to the required format
-            from_date = self._format_date(from_date)
-            to_date = self._format_date(to_date)
+            # Convert dates to the required format, the range is split into chunks below
             expiry_date = self._format_date(expiry_date) if expiry_date else None
 
             log.info(f"Fetching futures data for {stock_code}")
             log.debug(f"Parameters: from_date={from_date}, to_date={to_date}, interval={interval}, expiry_date={expiry_date}")
 
-            data = self.breeze.get_historical_data_v2(
-                interval=interval,
-                from_date=from_date,
-                to_date=to_date,
+            data = self._get_historical_data_chunked(
+                from_date,
+                to_date,
+                interval,
                 stock_code=stock_code,
                 exchange_code="NFO",
                 product_type="futures",
@@ -75,18 +239,16 @@ class BreezeAPI:
             raise Exception("Not connected to Breeze API. Call connect() first.")
 
         try:
-            # Convert dates to the required format
-            from_date = self._format_date(from_date)
-            to_date = self._format_date(to_date)
+            # Convert dates to the required format, the range is split into chunks below
             expiry_date = self._format_date(expiry_date) if expiry_date else None
 
             log.info(f"Fetching option data for {stock_code} {option_type} at {strike_price}")
             log.debug(f"Parameters: strike_price={strike_price}, option_type={option_type}, from_date={from_date}, to_date={to_date}, interval={interval}, expiry_date={expiry_date}")
 
-            data = self.breeze.get_historical_data_v2(
-                interval=interval,
-                from_date=from_date,
-                to_date=to_date,
+            data = self._get_historical_data_chunked(
+                from_date,
+                to_date,
+                interval,
                 stock_code=stock_code,
                 exchange_code="NFO",
                 product_type="Options",
@@ -98,4 +260,35 @@ class BreezeAPI:
             return data
         except Exception as e:
             log.error(f"Error fetching option data: {e}")
-            return None
\ No newline at end of file
+            return None
+
+class BreezeSession:
+    """
+    Process wide holder of one connected BreezeAPI. The session is generated
+    on first use and shared by every fetcher, including ones on other threads.
+    """
+
+    def __init__(self):
+        self._api = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._api is None:
+            with self._lock:
+                if self._api is None:
+                    api = BreezeAPI()
+                    api.connect()
+                    if api.transport != recorder.REPLAY:
+                        api.session_tokens.add_listener(api._on_new_session_token)
+                        api.session_tokens.start_refresher()
+                    self._api = api
+        return self._api
+
+    def reset(self):
+        with self._lock:
+            self._api = None
+
+breeze_session = BreezeSession()
+
+def get_breeze_api():
+    return breeze_session.get()
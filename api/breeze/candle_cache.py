@@ -0,0 +1,163 @@
+import os
+import json
+import sqlite3
+import logging
+from contextlib import closing
+from datetime import datetime
+from api.breeze import recorder
+
+log = logging.getLogger("candle_cache")
+
+CANDLE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+class CandleCache:
+    """
+    SQLite backed store for Breeze historical candles.
+
+    Candles are keyed by stock code, product type, strike, right, expiry and
+    interval. Each key also remembers the date range already downloaded, so a
+    repeat request only asks Breeze for the part of the range not on disk.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('CANDLE_CACHE_PATH', os.path.join(".cache", "candles.sqlite"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    cache_key TEXT NOT NULL,
+                    datetime TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (cache_key, datetime)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    cache_key TEXT PRIMARY KEY,
+                    from_date TEXT NOT NULL,
+                    to_date TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _to_datetime(date):
+        if isinstance(date, str):
+            return datetime.strptime(date, "%Y-%m-%d")
+        return date
+
+    @staticmethod
+    def make_key(stock_code, product_type, strike_price, right, expiry_date, interval):
+        expiry = CandleCache._to_datetime(expiry_date).strftime("%Y-%m-%d") if expiry_date else ""
+        return "|".join([stock_code, product_type.lower(), str(strike_price), right.lower(), expiry, interval])
+
+    def _coverage(self, conn, cache_key):
+        row = conn.execute(
+            "SELECT from_date, to_date FROM coverage WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        return row
+
+    def _last_candle(self, conn, cache_key):
+        row = conn.execute(
+            "SELECT MAX(datetime) FROM candles WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _store(self, conn, cache_key, candles, from_date, to_date):
+        conn.executemany(
+            "INSERT OR REPLACE INTO candles (cache_key, datetime, payload) VALUES (?, ?, ?)",
+            [(cache_key, str(candle['datetime']), json.dumps(candle)) for candle in candles]
+        )
+        conn.execute("""
+            INSERT INTO coverage (cache_key, from_date, to_date) VALUES (?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                from_date = MIN(from_date, excluded.from_date),
+                to_date = MAX(to_date, excluded.to_date)
+        """, (cache_key, from_date, to_date))
+
+    def _load(self, conn, cache_key, from_date, to_date):
+        rows = conn.execute(
+            "SELECT payload FROM candles WHERE cache_key = ? AND datetime >= ? AND datetime <= ? ORDER BY datetime",
+            (cache_key, from_date, to_date)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, cache_key, from_date, to_date, fetch):
+        """
+        Return Breeze style {'Success': [...]} data for the range, calling
+        fetch(from_date, to_date) only for the parts missing on disk. Returns
+        None when a required fetch fails, like BreezeAPI does.
+        """
+        # Recording and replaying work on the raw requests, the cache would hide or filter them
+        if recorder.transport_mode() != recorder.LIVE:
+            return fetch(from_date, to_date)
+
+        from_date = self._to_datetime(from_date)
+        to_date = self._to_datetime(to_date)
+        from_str = from_date.strftime(CANDLE_DATETIME_FORMAT)
+        to_str = to_date.strftime(CANDLE_DATETIME_FORMAT)
+
+        with closing(self._connect()) as conn:
+            coverage = self._coverage(conn, cache_key)
+            last_candle = self._last_candle(conn, cache_key)
+
+        if coverage is None:
+            missing = [(from_date, to_date)]
+        else:
+            covered_from, covered_to = coverage
+            missing = []
+            if from_str < covered_from:
+                missing.append((from_date, datetime.strptime(covered_from, CANDLE_DATETIME_FORMAT)))
+            if to_str > covered_to:
+                # Refetch from the last stored candle, it may have been stored before it closed.
+                # Coverage is one interval, so a request starting after it also fills the gap.
+                tail_from = datetime.strptime(min(last_candle or covered_to, covered_to), CANDLE_DATETIME_FORMAT)
+                missing.append((tail_from, to_date))
+
+        # Network calls happen outside the connection so parallel fetchers don't queue on it
+        fetched = []
+        for missing_from, missing_to in missing:
+            log.debug(f"Cache miss for {cache_key} between {missing_from} and {missing_to}")
+            data = fetch(missing_from, missing_to)
+            # An error response must not be stored, the range would count as downloaded
+            if not data or data.get('Status') != 200:
+                return None
+            fetched.append((data.get('Success') or [], missing_from, missing_to))
+
+        if not missing:
+            log.debug(f"Cache hit for {cache_key}")
+
+        with closing(self._connect()) as conn, conn:
+            for candles, missing_from, missing_to in fetched:
+                self._store(
+                    conn, cache_key, candles,
+                    missing_from.strftime(CANDLE_DATETIME_FORMAT),
+                    missing_to.strftime(CANDLE_DATETIME_FORMAT)
+                )
+            return {'Success': self._load(conn, cache_key, from_str, to_str), 'Status': 200, 'Error': None}
+
+    def get_futures_data(self, breeze, stock_code, from_date, to_date, interval="5minute", expiry_date=None):
+        cache_key = self.make_key(stock_code, "futures", 0, "others", expiry_date, interval)
+        return self.get(cache_key, from_date, to_date, lambda missing_from, missing_to: breeze.get_futures_data(
+            stock_code=stock_code,
+            from_date=missing_from,
+            to_date=missing_to,
+            interval=interval,
+            expiry_date=expiry_date
+        ))
+
+    def get_option_data(self, breeze, stock_code, strike_price, option_type, from_date, to_date, interval="5minute", expiry_date=None):
+        cache_key = self.make_key(stock_code, "options", strike_price, option_type, expiry_date, interval)
+        return self.get(cache_key, from_date, to_date, lambda missing_from, missing_to: breeze.get_option_data(
+            stock_code=stock_code,
+            strike_price=strike_price,
+            option_type=option_type,
+            from_date=missing_from,
+            to_date=missing_to,
+            interval=interval,
+            expiry_date=expiry_date
+        ))
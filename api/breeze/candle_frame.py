@@ -0,0 +1,51 @@
+import logging
+import numpy as np
+import pandas as pd
+from api.breeze.candle_cache import CANDLE_DATETIME_FORMAT
+
+log = logging.getLogger("candle_frame")
+
+# Breeze candle times are exchange local time without an offset
+CANDLE_TIMEZONE = "Asia/Kolkata"
+
+# Columns the strategies use and the dtype each is stored as. The rest of
+# what Breeze sends (stock_code, exchange_code, right, strike_price,
+# open_interest, ...) is dropped at ingestion.
+CANDLE_DTYPES = {
+    'datetime': f"datetime64[ns, {CANDLE_TIMEZONE}]",
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.int64,
+    'expiry_date': "category",
+}
+
+def to_candle_frame(candles):
+    """
+    Typed DataFrame from Breeze's list of candle dicts: timestamps parsed
+    once into tz-aware datetime64, prices as float, volume as int and the
+    repeated expiry string as a category.
+    """
+    raw = pd.DataFrame(candles)
+    if raw.empty:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in CANDLE_DTYPES.items()})
+
+    df = pd.DataFrame(index=pd.RangeIndex(len(raw)))
+    for column, dtype in CANDLE_DTYPES.items():
+        if column not in raw:
+            continue
+        if column == 'datetime':
+            df[column] = pd.to_datetime(raw[column], format=CANDLE_DATETIME_FORMAT).dt.tz_localize(CANDLE_TIMEZONE).astype(dtype)
+        elif column == 'volume':
+            df[column] = pd.to_numeric(raw[column]).fillna(0).astype(dtype)
+        elif column == 'expiry_date':
+            df[column] = raw[column].astype(dtype)
+        else:
+            df[column] = pd.to_numeric(raw[column]).astype(dtype)
+    return df
+
+def bytes_per_candle(df):
+    if df is None or df.empty:
+        return 0
+    return df.memory_usage(index=False, deep=True).sum() / len(df)
@@ -2,14 +2,13 @@
 import os
 from dotenv import load_dotenv
 import pyotp
-from breeze_connect import BreezeConnect
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-# Initialize SDK
-breeze = BreezeConnect(api_key=os.getenv('BREEZE_API_KEY'))
+# selenium and breeze_connect are imported where they are used, importing
+# this module must not start a browser stack or an SDK client
+
+def create_breeze_client():
+    from breeze_connect import BreezeConnect
+    return BreezeConnect(api_key=os.getenv('BREEZE_API_KEY'))
 
 class BreezeSessionLogin:
 
@@ -23,6 +22,10 @@ class BreezeSessionLogin:
         return totp.now()
 
     def login_with_totp(self, driver, username, password, api_key):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
         login_url = f"https://api.icicidirect.com/apiuser/login?api_key={api_key}"
         driver.get(login_url)
 
@@ -55,14 +58,13 @@ class BreezeSessionLogin:
         return session_token
 
     def get_session_token(self):
+        from selenium import webdriver
+
         driver = webdriver.Chrome()  # Make sure you have chromedriver installed and in PATH
         try:
             username = os.getenv('BREEZE_USERNAME')
             password = os.getenv('BREEZE_PASSWORD')
             api_key = os.getenv('BREEZE_API_KEY')
-            print(f"{username}")
-            print(f"{password}")
-            print(f"{api_key}")
             return self.login_with_totp(driver, username, password, api_key)
         finally:
             driver.quit()
@@ -76,5 +78,6 @@ class BreezeSessionLogin:
 # print(f"{session_token = }")
 
 # # Generate Session
+# breeze = create_breeze_client()
 # breeze.generate_session(api_secret=os.getenv('BREEZE_API_SECRET'),
 #                         session_token=session_token)
@@ -0,0 +1,108 @@
+import os
+import time
+import random
+import logging
+import threading
+from api.metrics import metrics
+
+log = logging.getLogger("breeze_rate_limiter")
+
+# Breeze documents a limit of 100 API calls per minute and 5000 per day
+CALLS_PER_MINUTE = int(os.getenv('BREEZE_CALLS_PER_MINUTE', 100))
+CALLS_PER_DAY = int(os.getenv('BREEZE_CALLS_PER_DAY', 5000))
+
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+class TokenBucket:
+    def __init__(self, capacity, period_seconds):
+        self.capacity = capacity
+        self.rate = capacity / period_seconds
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+class CallStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'calls': 0, 'delayed': 0, 'throttled': 0, 'retried': 0, 'failed': 0}
+
+    def increment(self, name):
+        with self._lock:
+            self.counts[name] += 1
+        metrics.inc("breeze_rate_limiter", event=name)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+class RateLimiter:
+    """
+    Client side limiter for Breeze calls. Every caller shares the same
+    buckets, so the limits hold across threads fetching in parallel.
+    """
+
+    def __init__(self, calls_per_minute=CALLS_PER_MINUTE, calls_per_day=CALLS_PER_DAY):
+        self.buckets = [TokenBucket(calls_per_minute, 60), TokenBucket(calls_per_day, 24 * 60 * 60)]
+        self.stats = CallStats()
+
+    def acquire(self):
+        waited = sum(bucket.acquire() for bucket in self.buckets)
+        self.stats.increment('calls')
+        if waited:
+            self.stats.increment('delayed')
+            log.debug(f"Rate limiter delayed call by {waited:.2f}s")
+
+    @staticmethod
+    def backoff(attempt):
+        # Full jitter so parallel callers don't retry in lockstep
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def call(self, func, is_throttled, is_transient, max_retries=MAX_RETRIES):
+        """
+        Run func under the limiter, retrying with backoff while
+        is_throttled(response) or is_transient(response) holds, or a
+        connection error is raised. Once retries run out a throttled or
+        failed response gives None, like the other failed fetches, and a
+        connection error is re-raised.
+        """
+        for attempt in range(max_retries + 1):
+            self.acquire()
+            try:
+                response = func()
+            except (ConnectionError, TimeoutError, OSError) as e:
+                if attempt == max_retries:
+                    self.stats.increment('failed')
+                    raise
+                log.warning(f"Transient error from Breeze: {e}, retrying")
+            else:
+                if is_throttled(response):
+                    self.stats.increment('throttled')
+                elif not is_transient(response):
+                    return response
+                if attempt == max_retries:
+                    self.stats.increment('failed')
+                    log.error(f"Breeze call still failing after {max_retries} retries: {response.get('Error')}")
+                    return None
+                log.warning(f"Breeze call failed with {response.get('Error')}, retrying")
+
+            self.stats.increment('retried')
+            time.sleep(self.backoff(attempt))
+
+historical_rate_limiter = RateLimiter()
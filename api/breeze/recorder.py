@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import closing
+
+log = logging.getLogger("breeze_recorder")
+
+# BREEZE_TRANSPORT selects how BreezeAPI talks to Breeze:
+#   live   - straight to the API (default)
+#   record - to the API, saving every historical request and response
+#   replay - no network, responses come from the recordings
+LIVE, RECORD, REPLAY = "live", "record", "replay"
+
+# Request fields that identify the instrument, the dates are left out
+INSTRUMENT_FIELDS = ("interval", "stock_code", "exchange_code", "product_type", "expiry_date", "right", "strike_price")
+
+def transport_mode():
+    mode = os.getenv('BREEZE_TRANSPORT', LIVE).lower()
+    if mode not in (LIVE, RECORD, REPLAY):
+        raise ValueError(f"Unknown BREEZE_TRANSPORT {mode!r}, expected one of {LIVE}, {RECORD}, {REPLAY}")
+    return mode
+
+def _digest(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+def request_key(params):
+    return _digest(params)
+
+def instrument_key(params):
+    return _digest({field: params.get(field) for field in INSTRUMENT_FIELDS})
+
+class RecordingStore:
+    """SQLite file of get_historical_data_v2 requests and their zlib compressed responses."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('BREEZE_RECORDING_PATH', os.path.join(".cache", "breeze_recordings.sqlite"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS recordings (
+                    request_key TEXT PRIMARY KEY,
+                    instrument_key TEXT NOT NULL,
+                    recorded_at REAL NOT NULL,
+                    params TEXT NOT NULL,
+                    response BLOB NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS recordings_instrument ON recordings (instrument_key, recorded_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, params, response):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?, ?)",
+                (
+                    request_key(params),
+                    instrument_key(params),
+                    time.time(),
+                    json.dumps(params, sort_keys=True, default=str),
+                    zlib.compress(json.dumps(response, default=str).encode()),
+                )
+            )
+
+    def load(self, params):
+        """
+        The response recorded for exactly these params or, since callers
+        usually ask for ranges relative to today, the latest one recorded
+        for the same instrument.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT response FROM recordings WHERE request_key = ?", (request_key(params),)
+            ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "SELECT response FROM recordings WHERE instrument_key = ? ORDER BY recorded_at DESC LIMIT 1",
+                    (instrument_key(params),)
+                ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+class RecordingClient:
+    """Wraps a connected BreezeConnect and records its historical calls."""
+
+    def __init__(self, client, store):
+        self.client = client
+        self.store = store
+
+    def get_historical_data_v2(self, **params):
+        response = self.client.get_historical_data_v2(**params)
+        self.store.save(params, response)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        # Callbacks like on_ticks have to land on the real client, the feed calls them from there
+        if name in ("client", "store"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.client, name, value)
+
+class ReplayClient:
+    """Serves recorded historical responses, optionally after a simulated network latency."""
+
+    def __init__(self, store, latency=None):
+        self.store = store
+        self.latency = float(os.getenv('BREEZE_REPLAY_LATENCY', 0)) if latency is None else latency
+
+    def get_historical_data_v2(self, **params):
+        if self.latency:
+            time.sleep(self.latency)
+        response = self.store.load(params)
+        if response is None:
+            log.warning(f"No recording for {params}")
+            return {'Success': None, 'Status': 404, 'Error': "No recording for this request"}
+        return response
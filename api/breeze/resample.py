@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from api.breeze.candle_frame import CANDLE_DTYPES, CANDLE_TIMEZONE
+
+# Intervals Breeze serves directly
+NATIVE_INTERVALS = {"1second", "1minute", "5minute", "30minute", "1day"}
+# Minute intervals that can be derived from 1 minute candles
+RESAMPLE_MINUTES = {
+    "1minute": 1,
+    "3minute": 3,
+    "5minute": 5,
+    "10minute": 10,
+    "15minute": 15,
+    "30minute": 30,
+    "60minute": 60,
+}
+# With CANDLE_BASE_INTERVAL=1minute every minute interval is derived from
+# one 1 minute download. Unset, only intervals Breeze lacks are derived.
+BASE_INTERVAL = "1minute"
+# NSE session opens at 09:15, bars are counted from there
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+# Derived frames kept in memory
+DERIVED_CACHE_SIZE = 64
+
+def base_interval_for(interval):
+    """The interval to download for interval, or None when Breeze should be asked for it directly."""
+    if interval not in RESAMPLE_MINUTES or interval == BASE_INTERVAL:
+        return None
+    if interval not in NATIVE_INTERVALS or os.getenv('CANDLE_BASE_INTERVAL') == BASE_INTERVAL:
+        return BASE_INTERVAL
+    return None
+
+def resample_candles(df, interval):
+    """
+    OHLCV bars of interval built from time ordered finer candles. Buckets
+    start at the session open (09:15) and every interval after it, so the
+    last bar of the day may be shorter. Candles before the open go to the
+    first bar, like the live candle aggregator does.
+    """
+    if df.empty:
+        return df.copy()
+    width = pd.Timedelta(minutes=RESAMPLE_MINUTES[interval]).value
+
+    # Bucketing works on exchange wall time in nanoseconds
+    wall = df['datetime'].dt.tz_localize(None).to_numpy(dtype="datetime64[ns]").view(np.int64)
+    day = wall - wall % pd.Timedelta(days=1).value
+    since_open = np.maximum(wall - day - SESSION_OPEN.value, 0)
+    buckets = day + SESSION_OPEN.value + since_open // width * width
+
+    starts = np.concatenate(([0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1))
+    ends = np.concatenate((starts[1:], [len(df)])) - 1
+
+    resampled = pd.DataFrame({
+        'datetime': pd.to_datetime(buckets[starts]).tz_localize(CANDLE_TIMEZONE).astype(CANDLE_DTYPES['datetime']),
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(df['volume'].to_numpy(), starts),
+    })
+    if 'expiry_date' in df:
+        resampled['expiry_date'] = df['expiry_date'].iloc[ends].to_numpy()
+        resampled['expiry_date'] = resampled['expiry_date'].astype(CANDLE_DTYPES['expiry_date'])
+    return resampled
+
+class DerivedFrameCache:
+    """
+    Keeps the last derived frames in memory. An entry is reused while the
+    base frame it came from is unchanged (same length, first and last
+    candle), so repeated cycles only resample when new base candles arrive.
+    """
+
+    def __init__(self, size=DERIVED_CACHE_SIZE):
+        self.size = size
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(base_df):
+        if base_df.empty:
+            return (0,)
+        first, last = base_df.iloc[0], base_df.iloc[-1]
+        return len(base_df), first['datetime'], last['datetime'], last['close'], last['volume']
+
+    def get(self, key, interval, base_df):
+        fingerprint = self._fingerprint(base_df)
+        with self._lock:
+            cached = self._frames.get((key, interval))
+            if cached is not None and cached[0] == fingerprint:
+                self._frames.move_to_end((key, interval))
+                return cached[1].copy()
+
+        derived = resample_candles(base_df, interval)
+        with self._lock:
+            self._frames[(key, interval)] = (fingerprint, derived)
+            self._frames.move_to_end((key, interval))
+            while len(self._frames) > self.size:
+                self._frames.popitem(last=False)
+        return derived.copy()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+import pytz
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger("breeze_session_token")
+
+# Breeze session keys stop working at the end of the day they were generated
+SESSION_TIMEZONE = pytz.timezone("Asia/Kolkata")
+# Log in again this long before the cached token expires
+REFRESH_AHEAD = timedelta(minutes=float(os.getenv('BREEZE_SESSION_REFRESH_AHEAD_MINUTES', 60)))
+# Wait before retrying a failed background login
+RETRY_SECONDS = 60
+# Never log in from the background more often than this
+MIN_LOGIN_SECONDS = float(os.getenv('BREEZE_MIN_LOGIN_SECONDS', 300))
+
+def session_expiry(issued_at=None):
+    issued_at = issued_at or datetime.now(SESSION_TIMEZONE)
+    next_day = (issued_at + timedelta(days=1)).date()
+    return SESSION_TIMEZONE.localize(datetime.combine(next_day, datetime.min.time()))
+
+def browser_login():
+    # Imported here so a cached token never loads selenium
+    from api.breeze.helper import BreezeSessionLogin
+    return BreezeSessionLogin().get_session_token()
+
+class SessionTokenStore:
+    """
+    JSON file with the session token and its expiry, readable by the owner
+    only. The directory holding it is made private too, so keep the token in
+    a directory of its own (.cache/breeze_session by default).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv(
+            'BREEZE_SESSION_CACHE_PATH', os.path.join(".cache", "breeze_session", "session.json")
+        )
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            return cached['session_token'], datetime.fromisoformat(cached['expires_at'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, session_token, expires_at):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            # makedirs leaves the mode of an existing directory alone
+            os.chmod(directory, 0o700)
+        # Written to a private temp file and renamed, so the token is never world readable or half written
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({'session_token': session_token, 'expires_at': expires_at.isoformat()}, f)
+        os.replace(temp_path, self.path)
+        os.chmod(self.path, 0o600)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+class SessionTokenManager:
+    """
+    Hands out the Breeze session token, reusing the one cached on disk while
+    it is valid. With a login step configured, a background thread logs in
+    again refresh_ahead before expiry and stores the new token, so a cold
+    start finds a valid token instead of waiting on the browser login.
+
+    login is any callable returning a new session token, by default the
+    selenium TOTP login when BREEZE_AUTO_LOGIN is set. Without one, the
+    token comes from BREEZE_SESSION_ID as before.
+    """
+
+    def __init__(self, login=None, store=None, refresh_ahead=REFRESH_AHEAD, expiry=session_expiry,
+                 min_login_seconds=MIN_LOGIN_SECONDS):
+        if login is None and os.getenv('BREEZE_AUTO_LOGIN', "").lower() in ("1", "true", "yes"):
+            login = browser_login
+        self.login = login
+        self.store = store or SessionTokenStore()
+        self.refresh_ahead = refresh_ahead
+        self.expiry = expiry
+        self.min_login_seconds = min_login_seconds
+        self._last_login = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def add_listener(self, listener):
+        """listener(session_token) is called after every background refresh."""
+        self._listeners.append(listener)
+
+    def _now(self):
+        return datetime.now(SESSION_TIMEZONE)
+
+    def _cached(self):
+        cached = self.store.load()
+        if cached and cached[1] > self._now():
+            return cached
+        return None
+
+    def _login(self):
+        started = time.perf_counter()
+        self._last_login = time.monotonic()
+        session_token = self.login()
+        expires_at = self.expiry(self._now())
+        self.store.save(session_token, expires_at)
+        log.info(f"Logged in to Breeze in {time.perf_counter() - started:.1f}s, session valid until {expires_at}")
+        return session_token
+
+    def get_token(self):
+        with self._lock:
+            cached = self._cached()
+            if cached:
+                return cached[0]
+            if self.login is None:
+                return os.getenv('BREEZE_SESSION_ID')
+            return self._login()
+
+    def invalidate(self, session_token):
+        """Drop the cached token after Breeze rejected it."""
+        with self._lock:
+            cached = self.store.load()
+            if cached and cached[0] == session_token:
+                self.store.clear()
+
+    def start_refresher(self):
+        if self.login is None or self._refresher is not None:
+            return
+        self._refresher = threading.Thread(target=self._refresh_loop, name="breeze-session-refresh", daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+
+    def _refresh_wait(self):
+        # Seconds until the next background login is due
+        now = self._now()
+        cached = self.store.load()
+        wait = 0 if cached is None else (cached[1] - self.refresh_ahead - now).total_seconds()
+        if wait <= 0 and cached is not None and self.expiry(now) <= cached[1]:
+            # A login now wouldn't outlive the cached token (both end at the
+            # same midnight), so wait for that one to expire instead
+            wait = (cached[1] - now).total_seconds()
+        if self._last_login is not None:
+            wait = max(wait, self._last_login + self.min_login_seconds - time.monotonic())
+        return wait
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            wait = self._refresh_wait()
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            try:
+                with self._lock:
+                    session_token = self._login()
+            except Exception as e:
+                log.error(f"Background Breeze login failed, retrying in {RETRY_SECONDS}s: {e}")
+                self._stop.wait(RETRY_SECONDS)
+                continue
+            for listener in self._listeners:
+                try:
+                    listener(session_token)
+                except Exception as e:
+                    log.error(f"Session token listener failed: {e}")
+
+session_tokens = SessionTokenManager()
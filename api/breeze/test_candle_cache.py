@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from api.breeze.candle_cache import CandleCache, CANDLE_DATETIME_FORMAT
+
+class StubFetch:
+    """Hourly candles for whatever range is asked, or a fixed response."""
+
+    def __init__(self, response=None):
+        self.response = response
+        self.calls = []
+
+    def __call__(self, from_date, to_date):
+        self.calls.append((from_date, to_date))
+        if self.response is not None:
+            return self.response
+        candles, candle_time = [], from_date
+        while candle_time <= to_date:
+            candles.append({'datetime': candle_time.strftime(CANDLE_DATETIME_FORMAT), 'close': 1.0})
+            candle_time += timedelta(hours=1)
+        return {'Success': candles, 'Status': 200, 'Error': None}
+
+def test_error_response_is_not_cached(tmp_path):
+    cache = CandleCache(str(tmp_path / "candles.sqlite"))
+    throttled = StubFetch({'Success': None, 'Status': 429, 'Error': "Too many requests"})
+    assert cache.get("key", datetime(2024, 1, 1), datetime(2024, 1, 2), throttled) is None
+
+    fetch = StubFetch()
+    data = cache.get("key", datetime(2024, 1, 1), datetime(2024, 1, 2), fetch)
+    assert len(fetch.calls) == 1
+    assert len(data['Success']) == 25
+
+def test_range_after_coverage_fills_the_gap(tmp_path):
+    cache = CandleCache(str(tmp_path / "candles.sqlite"))
+    fetch = StubFetch()
+    cache.get("key", datetime(2024, 1, 1), datetime(2024, 1, 3), fetch)
+    cache.get("key", datetime(2024, 3, 1), datetime(2024, 3, 3), fetch)
+
+    data = cache.get("key", datetime(2024, 2, 1), datetime(2024, 2, 5), fetch)
+    assert len(data['Success']) == 4 * 24 + 1
+    assert cache.get("key", datetime(2024, 1, 2), datetime(2024, 1, 2, 5), fetch)['Success']
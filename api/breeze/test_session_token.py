@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timedelta
+from api.breeze.session_token import SESSION_TIMEZONE, SessionTokenManager, SessionTokenStore
+
+class StubLogin:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"token-{self.calls}"
+
+def _manager(tmp_path, now, **kwargs):
+    login = StubLogin()
+    manager = SessionTokenManager(login=login, store=SessionTokenStore(str(tmp_path / "session.json")), **kwargs)
+    manager._now = lambda: now
+    return manager, login
+
+def _run_refresher(manager, seconds=0.5):
+    manager.start_refresher()
+    time.sleep(seconds)
+    manager.stop_refresher()
+    manager._refresher.join(timeout=1)
+
+def test_refresher_logs_in_once_near_midnight(tmp_path):
+    # Inside the refresh window a new login expires at the same midnight as the cached one
+    manager, login = _manager(tmp_path, SESSION_TIMEZONE.localize(datetime(2024, 8, 21, 23, 30)))
+    _run_refresher(manager)
+    assert login.calls == 1
+
+def test_refresher_renews_token_ahead_of_expiry(tmp_path):
+    now = SESSION_TIMEZONE.localize(datetime(2024, 8, 21, 12, 0))
+    manager, login = _manager(tmp_path, now, expiry=lambda issued_at: issued_at + timedelta(hours=8))
+    manager.store.save("cached", now + timedelta(minutes=30))
+    renewed = []
+    manager.add_listener(renewed.append)
+
+    _run_refresher(manager)
+    assert login.calls == 1
+    assert renewed == ["token-1"]
+    assert manager.get_token() == "token-1"
+
+def test_refresher_keeps_minimum_interval_between_logins(tmp_path):
+    # An expiry that never moves past the refresh window would otherwise log in back to back
+    now = SESSION_TIMEZONE.localize(datetime(2024, 8, 21, 12, 0))
+    manager, login = _manager(
+        tmp_path, now, expiry=lambda issued_at: issued_at + timedelta(minutes=1), min_login_seconds=60
+    )
+    manager.store.save("cached", now - timedelta(minutes=1))
+    _run_refresher(manager)
+    assert login.calls == 1
+
+def test_cached_token_is_reused(tmp_path):
+    now = SESSION_TIMEZONE.localize(datetime(2024, 8, 21, 23, 30))
+    manager, login = _manager(tmp_path, now)
+    assert manager.get_token() == "token-1"
+    assert manager.get_token() == "token-1"
+    assert login.calls == 1
+
+def test_store_makes_an_existing_directory_private(tmp_path):
+    directory = tmp_path / "breeze_session"
+    directory.mkdir(mode=0o755)
+    store = SessionTokenStore(str(directory / "session.json"))
+    store.save("token", SESSION_TIMEZONE.localize(datetime(2024, 8, 22)))
+    assert directory.stat().st_mode & 0o777 == 0o700
+    assert (directory / "session.json").stat().st_mode & 0o777 == 0o600
@@ -0,0 +1,53 @@
+import json
+import pytest
+from api.breeze import recorder
+from api.breeze.recorder import RecordingClient, RecordingStore
+from api.breeze.tick_feed import BreezeTickSource
+
+class StubBreezeConnect:
+    def __init__(self):
+        self.on_ticks = None
+        self.subscriptions = []
+
+    def ws_connect(self):
+        pass
+
+    def ws_disconnect(self):
+        pass
+
+    def subscribe_feeds(self, **params):
+        self.subscriptions.append(params)
+        return {'message': "subscribed"}
+
+    def get_historical_data_v2(self, **params):
+        return {'Success': [], 'Status': 200, 'Error': None}
+
+class StubBreezeAPI:
+    def __init__(self, breeze, transport):
+        self.breeze = breeze
+        self.transport = transport
+
+TICK = {'ltt': "Wed Aug 21 09:15:05 2024", 'product_type': "Futures", 'last': 51000.0, 'ltq': 15}
+
+def test_ticks_reach_the_handler_while_recording(tmp_path):
+    connect = StubBreezeConnect()
+    client = RecordingClient(connect, RecordingStore(str(tmp_path / "recordings.sqlite")))
+    record_path = tmp_path / "ticks.jsonl"
+    source = BreezeTickSource(StubBreezeAPI(client, recorder.RECORD), "CNXBAN", record_path=str(record_path))
+
+    received = []
+    source.start(received.append)
+    # The websocket thread calls the handler set on the real client
+    connect.on_ticks(TICK)
+    source.stop()
+
+    assert received == [TICK]
+    assert [json.loads(line) for line in record_path.read_text().splitlines()] == [TICK]
+    # Historical calls still go through the recorder
+    client.get_historical_data_v2(stock_code="CNXBAN")
+    assert client.store.load({'stock_code': "CNXBAN"}) == {'Success': [], 'Status': 200, 'Error': None}
+
+def test_replay_transport_has_no_tick_feed(tmp_path):
+    client = recorder.ReplayClient(RecordingStore(str(tmp_path / "recordings.sqlite")))
+    with pytest.raises(ValueError, match="replay"):
+        BreezeTickSource(StubBreezeAPI(client, recorder.REPLAY), "CNXBAN")
@@ -0,0 +1,186 @@
+import json
+import time
+import socket
+import logging
+import threading
+import socketserver
+from datetime import datetime
+from api.breeze import recorder
+
+log = logging.getLogger("tick_feed")
+
+# Format of the 'ltt' (last traded time) field in Breeze ticks
+TICK_TIME_FORMAT = "%a %b %d %H:%M:%S %Y"
+FEED_EXPIRY_FORMAT = "%d-%b-%Y"
+
+def parse_tick_time(tick):
+    return datetime.strptime(tick['ltt'], TICK_TIME_FORMAT)
+
+def instrument_key(product_type, strike_price=None, right=None):
+    # Futures share one key, options use the same "strike-type" key as historic_options_data
+    if str(product_type).lower().startswith("future"):
+        return "futures"
+    return f"{int(float(strike_price))}-{str(right).capitalize()}"
+
+def tick_instrument_key(tick):
+    return instrument_key(tick.get('product_type', 'futures'), tick.get('strike_price'), tick.get('right'))
+
+class BreezeTickSource:
+    """
+    Live ticks from the Breeze websocket feed. Ticks can be written to a
+    JSON lines file while streaming so the session can be replayed later.
+    """
+
+    def __init__(self, breeze_api, stock_code, record_path=None):
+        if breeze_api.transport == recorder.REPLAY:
+            raise ValueError(
+                "BREEZE_TRANSPORT=replay has no tick feed, replay recorded ticks with --replay HOST:PORT instead"
+            )
+        self.breeze_api = breeze_api
+        self.stock_code = stock_code
+        self.record_path = record_path
+        self._record_file = None
+        self._record_lock = threading.Lock()
+
+    def start(self, on_tick):
+        if self.record_path:
+            self._record_file = open(self.record_path, "a")
+
+        def handle_tick(tick):
+            if self._record_file:
+                with self._record_lock:
+                    self._record_file.write(json.dumps(tick) + "\n")
+            on_tick(tick)
+
+        client = self.breeze_api.breeze
+        client.ws_connect()
+        client.on_ticks = handle_tick
+        log.info("Connected to Breeze tick feed")
+
+    def subscribe(self, product_type, expiry_date, strike_price=None, right=None):
+        response = self.breeze_api.breeze.subscribe_feeds(
+            exchange_code="NFO",
+            stock_code=self.stock_code,
+            product_type=product_type,
+            expiry_date=expiry_date.strftime(FEED_EXPIRY_FORMAT),
+            strike_price=str(strike_price) if strike_price is not None else "0",
+            right=right or "others",
+            get_exchange_quotes=True,
+            get_market_depth=False
+        )
+        log.info(f"Subscribed to {instrument_key(product_type, strike_price, right)} feed: {response}")
+
+    def stop(self):
+        self.breeze_api.breeze.ws_disconnect()
+        if self._record_file:
+            self._record_file.close()
+            self._record_file = None
+
+class TickReplayServer:
+    """
+    Local stand-in for the Breeze feed. Streams ticks recorded by
+    BreezeTickSource as JSON lines to every client that connects. With
+    speed=1 ticks are paced by their traded time, higher speeds replay
+    faster and speed=0 sends them without delay.
+    """
+
+    def __init__(self, path, host="127.0.0.1", port=0, speed=0):
+        self.path = path
+        self.speed = speed
+        replay = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                replay._stream(self.wfile)
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def _stream(self, wfile):
+        previous_time = None
+        try:
+            with open(self.path) as ticks:
+                for line in ticks:
+                    if not line.strip():
+                        continue
+                    if self.speed:
+                        tick_time = parse_tick_time(json.loads(line))
+                        if previous_time is not None and tick_time > previous_time:
+                            time.sleep((tick_time - previous_time).total_seconds() / self.speed)
+                        previous_time = tick_time
+                    wfile.write(line.rstrip("\n").encode() + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            log.info("Replay client disconnected")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        log.info(f"Replaying {self.path} on {self.address[0]}:{self.address[1]}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class ReplayTickSource:
+    """Tick source reading from a TickReplayServer, drop-in for BreezeTickSource."""
+
+    def __init__(self, address):
+        self.address = address
+        self.subscribed = set()
+        self._socket = None
+        self._thread = None
+        self.finished = threading.Event()
+
+    def start(self, on_tick):
+        self._socket = socket.create_connection(self.address)
+
+        def read_ticks():
+            try:
+                with self._socket.makefile("r") as ticks:
+                    for line in ticks:
+                        tick = json.loads(line)
+                        # Like the live feed, only subscribed instruments come through
+                        if tick_instrument_key(tick) in self.subscribed:
+                            on_tick(tick)
+            except OSError:
+                pass
+            finally:
+                self.finished.set()
+
+        self._thread = threading.Thread(target=read_ticks, daemon=True)
+        self._thread.start()
+        log.info(f"Connected to tick replay at {self.address[0]}:{self.address[1]}")
+
+    def subscribe(self, product_type, expiry_date, strike_price=None, right=None):
+        self.subscribed.add(instrument_key(product_type, strike_price, right))
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def stop(self):
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay recorded Breeze ticks over a local socket")
+    parser.add_argument("path", help="JSON lines file written by BreezeTickSource(record_path=...)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1, help="1 replays in real time, 0 without delay")
+    args = parser.parse_args()
+
+    logging.basicConfig(level="INFO", format="%(message)s")
+    server = TickReplayServer(args.path, args.host, args.port, args.speed)
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger("metrics")
+
+# Upper bounds (seconds) of the latency histogram buckets, +Inf is implied
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+class Metrics:
+    """
+    Counters and latency histograms, keyed by name and labels. Everything
+    is a no-op while disabled: timer() hands back a shared null context and
+    timed() functions call straight through after one attribute check.
+    Enabled with METRICS=1, exported to METRICS_PATH (.json or Prometheus
+    text for any other extension).
+    """
+
+    def __init__(self, enabled=False, path=None):
+        self.enabled = enabled
+        self.path = path
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name, labels)
+
+    def timed(self, stage):
+        """Decorator recording each call's duration under stage_seconds{stage=...}."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe("stage_seconds", time.perf_counter() - started, stage=stage)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                dict({'name': name, 'labels': dict(labels)}, **histogram.snapshot())
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {'created_at': time.time(), 'counters': counters, 'histograms': histograms}
+
+    @staticmethod
+    def _prometheus_labels(labels, **extra):
+        labels = dict(labels, **extra)
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        for name in sorted({counter['name'] for counter in snapshot['counters']}):
+            lines.append(f"# TYPE {name}_total counter")
+            for counter in snapshot['counters']:
+                if counter['name'] == name:
+                    lines.append(f"{name}_total{self._prometheus_labels(counter['labels'])} {counter['value']}")
+        for name in sorted({histogram['name'] for histogram in snapshot['histograms']}):
+            lines.append(f"# TYPE {name} histogram")
+            for histogram in snapshot['histograms']:
+                if histogram['name'] != name:
+                    continue
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f"{name}_bucket{self._prometheus_labels(histogram['labels'], le=bound)} {count}")
+                lines.append(f"{name}_sum{self._prometheus_labels(histogram['labels'])} {histogram['sum']}")
+                lines.append(f"{name}_count{self._prometheus_labels(histogram['labels'])} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Write the metrics to path (METRICS_PATH by default). Does nothing while disabled."""
+        path = path or self.path
+        if not self.enabled or not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Replace in one step so a textfile collector never reads half a file. Every
+        # thread writes its own temp file and the lock orders concurrent exports.
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            content = json.dumps(self.snapshot(), indent=2) if path.endswith(".json") else self.to_prometheus()
+            with open(temp_path, "w") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        log.debug(f"Wrote metrics to {path}")
+
+metrics = Metrics(
+    enabled=os.getenv('METRICS', "").lower() in ("1", "true", "yes"),
+    path=os.getenv('METRICS_PATH', os.path.join(".cache", "metrics.prom")),
+)
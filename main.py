@@ -1,21 +1,33 @@
-﻿import logging
-from rich.logging import RichHandler
-from rich.console import Console
-from strategies.stochastic.historic_data import fetch_banknifty_futures_history, fetch_banknifty_options_history
-from strategies.stochastic.stochastic import run_strategy
-
-# Set up logging
-logging.basicConfig(
-    level="INFO",
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
-
-# Create a console object for rich output
-console = Console()
+﻿import os
+import sys
+import time
+import logging
+import argparse
+import subprocess
+from api.breeze import stock_codes
+
+# Only the standard library is imported up front. pandas, ta, rich,
+# breeze_connect and selenium are imported inside the subcommands that
+# use them, so `main.py --help` or a replay starts without paying for them.
+HEAVY_MODULES = ["pandas", "numpy", "ta", "rich", "breeze_connect", "selenium"]
+# Time allowed for importing this module in a fresh interpreter
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', 100))
+
+def setup_logging(level="INFO"):
+    from rich.logging import RichHandler
+
+    logging.basicConfig(
+        level=level,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(rich_tracebacks=True)]
+    )
 
 def test_futures():
+    from rich.console import Console
+    from strategies.stochastic.historic_data import fetch_banknifty_futures_history
+
+    console = Console()
     console.print("[bold green]Starting Bank Nifty Futures Data Fetch[/bold green]")
     banknifty_futures_data = fetch_banknifty_futures_history()
     if banknifty_futures_data is not None:
@@ -26,9 +38,13 @@ def test_futures():
     else:
         console.print("[bold red]Failed to fetch data. Please check the logs for more information.[/bold red]")
 
-def test_options():
+def test_options(strike_price=50100, option_type="Call"):
+    from rich.console import Console
+    from strategies.stochastic.historic_data import fetch_banknifty_options_history
+
+    console = Console()
     console.print("[bold green]Starting Bank Nifty Options Data Fetch[/bold green]")
-    banknifty_options_data = fetch_banknifty_options_history(50100, "Call")
+    banknifty_options_data = fetch_banknifty_options_history(strike_price, option_type)
     if banknifty_options_data is not None:
         print(banknifty_options_data)
         print("columns", banknifty_options_data.columns.values.tolist())
@@ -37,7 +53,183 @@ def test_options():
     else:
         console.print("[bold red]Failed to fetch data. Please check the logs for more information.[/bold red]")
 
+def command_run(args):
+    if args.live or args.replay:
+        from strategies.stochastic.live import run_live
+
+        replay_address = None
+        if args.replay:
+            host, port = args.replay.rsplit(":", 1)
+            replay_address = (host, int(port))
+        run_live(replay_address=replay_address, record_path=args.record)
+    elif args.underlyings:
+        from strategies.stochastic.multi import run_underlyings, print_cycle_times
+        from strategies.stochastic.stochastic import print_valid_trades
+
+        started = time.perf_counter()
+        results = run_underlyings(args.underlyings, vectorized=not args.loop)
+        wall_seconds = time.perf_counter() - started
+        for result in results.values():
+            print_valid_trades(result['trade_log'])
+            result['trade_log'].close()
+        print_cycle_times(results, wall_seconds)
+    elif args.checkpoint:
+        from strategies.stochastic.checkpoint import StrategyCheckpoint, run_checkpointed
+
+        checkpoint = StrategyCheckpoint(None if args.checkpoint is True else args.checkpoint)
+        while True:
+            started = time.monotonic()
+            run_checkpointed(checkpoint)
+            if not args.every:
+                break
+            time.sleep(max(args.every - (time.monotonic() - started), 0))
+    else:
+        from strategies.stochastic.stochastic import run_strategy, OPTION_LADDER
+
+        ladder = OPTION_LADDER if args.ladder is None else args.ladder
+        run_strategy(vectorized=not args.loop, ladder=ladder).close()
+
+def command_backtest(args):
+    from strategies.stochastic.backtest import run_backtest, print_backtest_summary
+
+    # Any exit rule given turns the exit simulation on, the rest keep their defaults
+    exit_rules = {
+        name: getattr(args, name)
+        for name in ("stop_loss", "target", "trailing_stop", "max_bars")
+        if getattr(args, name) is not None
+    }
+    if not (args.exits or exit_rules):
+        exit_rules = None
+
+    trades, timings, exits = run_backtest(
+        args.from_date, args.to_date, args.stock_code, args.interval, processes=args.processes, exit_rules=exit_rules
+    )
+    print_backtest_summary(trades, timings)
+    if exit_rules is not None:
+        from strategies.stochastic.exits import print_exit_summary
+
+        print_exit_summary(exits)
+
+def command_fetch(args):
+    if args.instrument == "futures":
+        test_futures()
+    else:
+        test_options(args.strike, args.type)
+
+def command_bench(args):
+    from strategies.stochastic.bench import run_benchmarks
+
+    run_benchmarks(args.output, args.seed)
+
+def command_sweep(args):
+    from strategies.stochastic.sweep import parse_grid, run_sweep_cli
+
+    try:
+        grid = parse_grid(args.grid or [])
+    except ValueError as e:
+        args.parser.error(str(e))
+    run_sweep_cli(grid, args.random, args.seed, args.processes, args.rank_by, args.top)
+
+def command_check_startup(args):
+    """Import this module in a fresh interpreter and fail when it is over budget or pulls in a heavy module."""
+    probe = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = (time.perf_counter() - started) * 1000\n"
+        f"loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+        "print(f'{elapsed:.1f}', ','.join(loaded))\n"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(args.repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", probe], cwd=here, capture_output=True, text=True, check=True
+        ).stdout.split()
+        timings.append(float(output[0]))
+        loaded = output[1].split(",") if len(output) > 1 else []
+
+    best = min(timings)
+    print(f"import main: {best:.1f}ms best of {args.repeats} (budget {args.budget:.0f}ms)")
+    if loaded:
+        print(f"Heavy modules imported at startup: {', '.join(loaded)}")
+    if best > args.budget or loaded:
+        sys.exit(1)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Trading strategies on the ICICI Breeze API")
+    subcommands = parser.add_subparsers(dest="command")
+
+    run = subcommands.add_parser("run", help="Run the stochastic strategy (the default)")
+    run.add_argument("--loop", action="store_true", help="Evaluate bar by bar instead of vectorized")
+    run.add_argument("--ladder", type=int, metavar="STEPS",
+                     help="Strikes either side of the futures range in the option chain (OPTION_LADDER, 2 by default), 0 for only the signalled ones")
+    run.add_argument("--underlyings", nargs="+", metavar="STOCK_CODE", help="Run these underlyings concurrently")
+    run.add_argument("--live", action="store_true", help="Evaluate on every candle close from the tick feed")
+    run.add_argument("--replay", metavar="HOST:PORT", help="Stream ticks from a TickReplayServer")
+    run.add_argument("--record", metavar="PATH", help="Record live ticks to this file")
+    run.add_argument("--checkpoint", nargs="?", const=True, metavar="PATH",
+                     help="Resume from and save the strategy state (STRATEGY_CHECKPOINT_PATH by default)")
+    run.add_argument("--every", type=float, metavar="SECONDS", help="With --checkpoint, run a cycle this often")
+    run.set_defaults(handler=command_run)
+
+    backtest = subcommands.add_parser("backtest", help="Walk the strategy forward over a date range")
+    backtest.add_argument("from_date", help="YYYY-MM-DD")
+    backtest.add_argument("to_date", help="YYYY-MM-DD")
+    backtest.add_argument("--stock-code", default=stock_codes.BANK_NIFTY)
+    backtest.add_argument("--interval", default="5minute")
+    backtest.add_argument("--processes", type=int)
+    backtest.add_argument("--exits", action="store_true", help="Simulate exits and report P&L")
+    backtest.add_argument("--stop-loss", type=float, help="Fraction of the entry premium, e.g. 0.25")
+    backtest.add_argument("--target", type=float, help="Fraction of the entry premium, e.g. 0.5")
+    backtest.add_argument("--trailing-stop", type=float, help="Fraction below the highest high since entry")
+    backtest.add_argument("--max-bars", type=int, help="Exit after this many candles")
+    backtest.set_defaults(handler=command_backtest)
+
+    fetch = subcommands.add_parser("fetch", help="Fetch and print recent Bank Nifty history")
+    fetch.add_argument("instrument", choices=["futures", "options"])
+    fetch.add_argument("--strike", type=int, default=50100)
+    fetch.add_argument("--type", choices=["Call", "Put"], default="Call")
+    fetch.set_defaults(handler=command_fetch)
+
+    bench = subcommands.add_parser("bench", help="Benchmark the indicators and run_strategy")
+    bench.add_argument("--output", default="bench_results.json")
+    bench.add_argument("--seed", type=int, default=0)
+    bench.set_defaults(handler=command_bench)
+
+    sweep = subcommands.add_parser("sweep", help="Rank stochastic strategy parameter combinations on recent history")
+    sweep.add_argument("--grid", nargs="+", metavar="NAME=V1,V2",
+                       help="Values to sweep, e.g. k_period=5,9 vwap_window=4,6 (k_period, d_period, vwap_window, k_threshold or step)")
+    sweep.add_argument("--random", type=int, metavar="SAMPLES", help="Evaluate this many random combinations of the grid instead of all")
+    sweep.add_argument("--seed", type=int)
+    sweep.add_argument("--processes", type=int)
+    sweep.add_argument("--rank-by", default="total_return", choices=["trades", "hit_rate", "mean_return", "total_return"])
+    sweep.add_argument("--top", type=int, default=20)
+    sweep.set_defaults(handler=command_sweep, parser=sweep)
+
+    check_startup = subcommands.add_parser("check-startup", help="Check the import time of this CLI against its budget")
+    check_startup.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS, help="Milliseconds")
+    check_startup.add_argument("--repeats", type=int, default=5)
+    check_startup.set_defaults(handler=command_check_startup)
+
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # Plain `python main.py` still runs the strategy once
+        args = parser.parse_args(["run"])
+    if args.command == "check-startup":
+        args.handler(args)
+        return
+
+    setup_logging()
+    args.handler(args)
+
+    # Written only when METRICS is on
+    from api.metrics import metrics
+    metrics.export()
+
 if __name__ == "__main__":
-    # test_futures()
-    # test_options()
-    run_strategy()
\ No newline at end of file
+    main()
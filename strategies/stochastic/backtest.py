@@ -0,0 +1,174 @@
+import time
+import logging
+import calendar
+from datetime import datetime, timedelta, date
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pandas as pd
+from rich.table import Table
+from rich.console import Console
+from api.breeze import stock_codes
+from strategies.stochastic.historic_data import fetch_futures_history, fetch_options_history
+from strategies.stochastic.stochastic import (
+    calculate_session_vwap, check_vwap_condition, evaluate_signals_vectorized, plan_option_fetches
+)
+from strategies.stochastic.trade_log import TradeLog
+from strategies.stochastic.exits import simulate_trade_log
+
+log = logging.getLogger(__name__)
+console = Console()
+
+# Bank Nifty weekly options and monthly futures both expire on a Wednesday.
+# Exchange holidays that move an expiry a day earlier are not modelled.
+EXPIRY_WEEKDAY = calendar.WEDNESDAY
+# Option history loaded before each session so the stochastic is warm at the open
+OPTION_LOOKBACK_DAYS = 5
+
+def _as_date(day):
+    if isinstance(day, str):
+        return datetime.strptime(day, "%Y-%m-%d").date()
+    if isinstance(day, datetime):
+        return day.date()
+    return day
+
+def weekly_expiry(day, weekday=EXPIRY_WEEKDAY):
+    day = _as_date(day)
+    return day + timedelta(days=(weekday - day.weekday()) % 7)
+
+def monthly_expiry(day, weekday=EXPIRY_WEEKDAY):
+    # Last given weekday of the month, rolling to next month once it has passed
+    day = _as_date(day)
+    year, month = day.year, day.month
+    while True:
+        last_day = date(year, month, calendar.monthrange(year, month)[1])
+        expiry = last_day - timedelta(days=(last_day.weekday() - weekday) % 7)
+        if expiry >= day:
+            return expiry
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def load_futures_history(from_date, to_date, stock_code=stock_codes.BANK_NIFTY, interval="5minute"):
+    """Front month futures candles for the range, rolling to the next contract after each expiry."""
+    from_date, to_date = _as_date(from_date), _as_date(to_date)
+    frames = []
+    period_start = from_date
+    while period_start <= to_date:
+        expiry = monthly_expiry(period_start)
+        period_end = min(expiry, to_date)
+        df = fetch_futures_history(
+            datetime.combine(period_start, datetime.min.time()),
+            datetime.combine(period_end, datetime.max.time().replace(microsecond=0)),
+            datetime.combine(expiry, datetime.min.time()),
+            stock_code=stock_code,
+            interval=interval
+        )
+        if df is not None and not df.empty:
+            frames.append(df)
+        period_start = expiry + timedelta(days=1)
+
+    if not frames:
+        return None
+    futures_df = pd.concat(frames, ignore_index=True)
+    return futures_df.drop_duplicates(subset='datetime', keep='last').sort_values('datetime', ignore_index=True)
+
+def split_sessions(futures_df):
+    session_dates = pd.to_datetime(futures_df['datetime']).dt.date
+    return {session: df.reset_index(drop=True) for session, df in futures_df.groupby(session_dates, sort=True)}
+
+def _session_signals(session_df):
+    session_df = calculate_session_vwap(session_df)
+    above_vwap, below_vwap = check_vwap_condition(session_df)
+    return session_df, above_vwap, below_vwap
+
+def _prefetch_session_options(session, planned_options, stock_code, interval, max_workers):
+    expiry = datetime.combine(weekly_expiry(session), datetime.min.time())
+    from_date = datetime.combine(session - timedelta(days=OPTION_LOOKBACK_DAYS), datetime.min.time())
+    to_date = datetime.combine(session, datetime.max.time().replace(microsecond=0))
+
+    def fetch(option):
+        strike_price, option_type = option
+        return fetch_options_history(strike_price, option_type, from_date, to_date, expiry, stock_code=stock_code, interval=interval)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        option_dfs = list(executor.map(fetch, planned_options))
+    return {f"{strike_price}-{option_type}": option_df for (strike_price, option_type), option_df in zip(planned_options, option_dfs)}
+
+def _run_session(session_args):
+    # Runs in a worker process, everything it needs is passed in
+    session, session_df, above_vwap, below_vwap, historic_options_data, exit_rules = session_args
+    started = time.perf_counter()
+    trades_df, _ = evaluate_signals_vectorized(
+        session_df, above_vwap, below_vwap, historic_options_data, vwap=calculate_session_vwap
+    )
+    exits_df = None
+    if exit_rules is not None:
+        exits_df = simulate_trade_log(trades_df, historic_options_data, **exit_rules)
+    return session, trades_df, exits_df, len(session_df), time.perf_counter() - started
+
+def run_backtest(from_date, to_date, stock_code=stock_codes.BANK_NIFTY, interval="5minute", processes=None, fetch_workers=8,
+                 exit_rules=None):
+    """
+    Walk the strategy forward over every trading session between the dates.
+    VWAP restarts each session, futures roll to the front month and options
+    to the weekly expiry of the session. Data is loaded up front in this
+    process (sharing the Breeze session, rate limiter and candle cache) and
+    the sessions are then evaluated on a process pool.
+
+    With exit_rules (simulate_exits keyword arguments, {} for the defaults)
+    every session's trades are also exited against its option candles.
+
+    Returns the consolidated trades (also written to TRADE_LOG_DIR when set),
+    a per session timing frame and the simulated exits (empty without
+    exit_rules).
+    """
+    fetch_started = time.perf_counter()
+    futures_df = load_futures_history(from_date, to_date, stock_code=stock_code, interval=interval)
+    if futures_df is None:
+        log.error("No futures history for the backtest range")
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    sessions = split_sessions(futures_df)
+    session_args = []
+    fetch_seconds = {}
+    for session, session_df in sessions.items():
+        session_fetch_started = time.perf_counter()
+        session_df, above_vwap, below_vwap = _session_signals(session_df)
+        planned_options = plan_option_fetches(session_df, above_vwap, below_vwap)
+        historic_options_data = _prefetch_session_options(session, planned_options, stock_code, interval, fetch_workers)
+        session_args.append((session, session_df, above_vwap, below_vwap, historic_options_data, exit_rules))
+        fetch_seconds[session] = time.perf_counter() - session_fetch_started
+    log.info(f"Loaded {len(sessions)} sessions in {time.perf_counter() - fetch_started:.2f}s")
+
+    compute_started = time.perf_counter()
+    trade_log = TradeLog()
+    timings = []
+    exit_frames = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for session, trades_df, exits_df, bars, seconds in executor.map(_run_session, session_args, chunksize=8):
+            trade_log.extend(trades_df)
+            if exits_df is not None and not exits_df.empty:
+                exit_frames.append(exits_df)
+            timings.append({
+                'Session': session,
+                'Bars': bars,
+                'Trades': len(trades_df),
+                'Fetch Seconds': round(fetch_seconds[session], 4),
+                'Compute Seconds': round(seconds, 4),
+            })
+    log.info(f"Evaluated {len(sessions)} sessions in {time.perf_counter() - compute_started:.2f}s")
+
+    trade_log.close()
+    exits = pd.concat(exit_frames, ignore_index=True) if exit_frames else pd.DataFrame()
+    return trade_log.to_frame(), pd.DataFrame(timings), exits
+
+def print_backtest_summary(trades, timings):
+    table = Table(title="Backtest Sessions")
+    for column in ['Session', 'Bars', 'Trades', 'Fetch Seconds', 'Compute Seconds']:
+        table.add_column(column, style="cyan")
+    for session in timings.itertuples(index=False):
+        table.add_row(*[str(value) for value in session])
+    console.print(table)
+
+    if not timings.empty:
+        console.print(
+            f"[bold green]{len(trades)} trades over {len(timings)} sessions, "
+            f"compute {timings['Compute Seconds'].sum():.2f}s, fetch {timings['Fetch Seconds'].sum():.2f}s[/bold green]"
+        )
@@ -0,0 +1,186 @@
+import io
+import gc
+import zlib
+import json
+import time
+import logging
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from rich.console import Console
+from api.breeze.breeze import breeze_session
+from api.breeze.candle_cache import CandleCache
+from strategies.stochastic.option_cache import OptionHistoryCache
+from strategies.stochastic import historic_data, stochastic
+from strategies.stochastic.stochastic import (
+    calculate_vwap, calculate_stochastic, calculate_stochastic_inbuilt, check_vwap_condition, get_nearest_option
+)
+
+log = logging.getLogger(__name__)
+console = Console()
+
+INDICATOR_SIZES = [1_000, 10_000, 100_000]
+STRATEGY_SIZES = [500, 2_000, 5_000]
+# The futures fetch in run_strategy asks for this many days, synthetic candles are spread over it
+FUTURES_WINDOW = timedelta(days=3)
+
+def generate_candles(bars, start_price, seed, start=None, spacing=timedelta(minutes=5)):
+    """Seeded random walk OHLCV candles in the shape Breeze returns them."""
+    rng = np.random.default_rng(seed)
+    close = np.maximum(start_price + np.cumsum(rng.normal(0, start_price * 0.0006, bars)), 1)
+    open_ = np.maximum(close + rng.normal(0, start_price * 0.0002, bars), 1)
+    high = np.maximum(open_, close) + rng.uniform(0, start_price * 0.0004, bars)
+    low = np.maximum(np.minimum(open_, close) - rng.uniform(0, start_price * 0.0004, bars), 0.05)
+    start = start or datetime(2024, 8, 19, 9, 15)
+    return pd.DataFrame({
+        'datetime': [(start + spacing * i).strftime("%Y-%m-%d %H:%M:%S") for i in range(bars)],
+        'open': open_.round(2),
+        'high': high.round(2),
+        'low': low.round(2),
+        'close': close.round(2),
+        'volume': rng.integers(25, 5_000, bars),
+        'expiry_date': "28-Aug-2024",
+    })
+
+class OfflineBreezeAPI:
+    """
+    Stand-in for BreezeAPI that answers historical calls with seeded
+    synthetic candles. All instruments share one timestamp grid so futures
+    and option candles line up like real ones do.
+    """
+
+    def __init__(self, bars, seed=0, futures_price=50_000):
+        self.seed = seed
+        self.futures_price = futures_price
+        self.spacing = max(FUTURES_WINDOW / bars, timedelta(seconds=1))
+        self.epoch = datetime(2024, 1, 1)
+        self.calls = 0
+
+    def _grid(self, from_date, to_date):
+        first = -(-(from_date - self.epoch) // self.spacing)
+        last = (to_date - self.epoch) // self.spacing
+        return first, max(last - first + 1, 0)
+
+    def _candles(self, from_date, to_date, start_price, seed):
+        self.calls += 1
+        first, bars = self._grid(from_date, to_date)
+        df = generate_candles(bars, start_price, seed, start=self.epoch + first * self.spacing, spacing=self.spacing)
+        return {'Success': df.to_dict('records'), 'Status': 200, 'Error': None}
+
+    def get_futures_data(self, stock_code, from_date, to_date, interval="5minute", expiry_date=None):
+        return self._candles(from_date, to_date, self.futures_price, self.seed)
+
+    def get_option_data(self, stock_code, strike_price, option_type, from_date, to_date, interval="5minute", expiry_date=None):
+        # Rough intrinsic plus time value so the ladder looks like an option chain
+        moneyness = self.futures_price - strike_price if option_type == 'Call' else strike_price - self.futures_price
+        start_price = max(moneyness, 0) + 250
+        return self._candles(from_date, to_date, start_price, zlib.crc32(f"{self.seed}-{int(strike_price)}-{option_type}".encode()))
+
+def _time(func, repeats):
+    durations = []
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+def _peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure(name, bars, func, repeats=5):
+    durations = _time(func, repeats)
+    best = min(durations)
+    result = {
+        'name': name,
+        'bars': bars,
+        'repeats': repeats,
+        'best_seconds': best,
+        'median_seconds': statistics.median(durations),
+        'bars_per_second': bars / best if best else None,
+        'peak_memory_bytes': _peak_memory(func),
+    }
+    log.info(f"{name} ({bars} bars): {best * 1000:.2f}ms best, {result['peak_memory_bytes'] / 1024:.0f} KiB peak")
+    return result
+
+def bench_indicators(sizes=INDICATOR_SIZES, seed=0, repeats=5):
+    results = []
+    for bars in sizes:
+        candles = generate_candles(bars, 50_000, seed)
+        with_vwap = calculate_vwap(candles.copy())
+        prices = candles['close'].to_numpy()
+
+        results.append(measure("calculate_vwap", bars, lambda: calculate_vwap(candles.copy()), repeats))
+        results.append(measure("calculate_stochastic", bars, lambda: calculate_stochastic(candles.copy()), repeats))
+        results.append(measure("calculate_stochastic_inbuilt", bars, lambda: calculate_stochastic_inbuilt(candles.copy()), repeats))
+        results.append(measure("check_vwap_condition", bars, lambda: check_vwap_condition(with_vwap), repeats))
+        results.append(measure(
+            "get_nearest_option", bars,
+            lambda: [get_nearest_option(price, 'Call' if i % 2 else 'Put') for i, price in enumerate(prices)],
+            repeats
+        ))
+    return results
+
+def bench_run_strategy(sizes=STRATEGY_SIZES, seed=0, repeats=3, vectorized=True):
+    """Full run_strategy passes against OfflineBreezeAPI, through a throwaway candle cache."""
+    results = []
+    quiet = Console(file=io.StringIO())
+    original = (breeze_session._api, historic_data.set_candle_cache(None), historic_data.console, stochastic.console)
+    try:
+        historic_data.console = stochastic.console = quiet
+        for bars in sizes:
+            breeze_session._api = OfflineBreezeAPI(bars, seed)
+
+            def run():
+                # Fresh caches every pass so each one does the full work, run_strategy starts its own trade log
+                with tempfile.TemporaryDirectory() as directory:
+                    historic_data.set_candle_cache(CandleCache(f"{directory}/candles.sqlite"))
+                    stochastic.run_strategy(vectorized=vectorized, option_cache=OptionHistoryCache())
+
+            name = "run_strategy" if vectorized else "run_strategy_loop"
+            results.append(measure(name, bars, run, repeats))
+    finally:
+        breeze_session._api, candle_cache, historic_data.console, stochastic.console = original
+        historic_data.set_candle_cache(candle_cache)
+    return results
+
+def run_benchmarks(output="bench_results.json", seed=0, indicator_sizes=INDICATOR_SIZES, strategy_sizes=STRATEGY_SIZES):
+    results = bench_indicators(indicator_sizes, seed)
+    results += bench_run_strategy(strategy_sizes, seed)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'seed': seed,
+        'results': results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    console.print(f"[bold green]Wrote {len(results)} benchmark results to {output}[/bold green]")
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the stochastic strategy indicators and run_strategy")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--indicator-sizes", type=int, nargs="+", default=INDICATOR_SIZES)
+    parser.add_argument("--strategy-sizes", type=int, nargs="+", default=STRATEGY_SIZES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level="INFO", format="%(message)s")
+    logging.getLogger("breeze_api").setLevel(logging.WARNING)
+    logging.getLogger("strategies.stochastic.stochastic").setLevel(logging.WARNING)
+    run_benchmarks(args.output, args.seed, args.indicator_sizes, args.strategy_sizes)
@@ -0,0 +1,236 @@
+import os
+import time
+import zlib
+import pickle
+import logging
+import itertools
+from collections import deque
+import pandas as pd
+from api.metrics import metrics
+from strategies.stochastic.historic_data import fetch_banknifty_futures_history, fetch_banknifty_options_history
+from strategies.stochastic.stochastic import get_nearest_option, is_entry, next_flag, print_valid_trades, trade_row
+from strategies.stochastic.streaming import StreamingIndicators
+from strategies.stochastic.trade_log import TradeLog
+
+log = logging.getLogger(__name__)
+
+# Bumped whenever the pickled state changes shape, older checkpoints are then ignored
+CHECKPOINT_VERSION = 4
+CHECKPOINT_PATH = os.getenv('STRATEGY_CHECKPOINT_PATH', os.path.join(".cache", "strategy_checkpoint.pkl"))
+# A slide leaving fewer candles than this feeds them again instead, the stochastic and VWAP run look back less far
+REPLAY_CANDLES = 16
+
+def _times(df):
+    # Candle times as int64 nanoseconds, cheap to compare and to pickle
+    return pd.DatetimeIndex(df['datetime']).asi8
+
+class StrategyState:
+    """
+    Everything run_strategy rebuilds from the full history on every call,
+    kept between cycles: the last futures bar evaluated, the streaming
+    futures indicators, one set of streaming indicators per option key in
+    use (with the last candle fed to it), the stochastic flag and the trade
+    log. A cycle only feeds candles newer than these.
+
+    run_strategy's VWAP accumulates from the first candle of each fetch, so
+    the candles fed that the fetch still holds are kept per key too. When a
+    fetch starts later (the window slid), the candles that fell out are
+    taken back out of the VWAP, giving the same values a fresh run on that
+    fetch would.
+    """
+
+    def __init__(self, step=100):
+        self.version = CHECKPOINT_VERSION
+        self.step = step
+        self.last_bar = None
+        self.futures = StreamingIndicators()
+        self.options = {}
+        # (time, high, low, close, volume) of the candles fed per key, oldest first
+        self.fed = {}
+        self.latest = {}
+        self.flag_stochastic_fulfilled = False
+        self.trade_log = TradeLog()
+
+    def _feed(self, key, indicators, candle_time, candle):
+        self.fed.setdefault(key, deque()).append(
+            (candle_time, candle['high'], candle['low'], candle['close'], candle['volume'])
+        )
+        return indicators.update(candle)
+
+    def _slide(self, key, indicators, times, df):
+        """
+        The indicators for key moved to a fetch (df, with its candle times)
+        that starts at times[0]. Only the candles that fell out of the
+        window are undone; the indicators are built again only when few
+        candles are left or the fetch reaches back before the first one fed.
+        """
+        fed = self.fed.get(key)
+        if not fed or fed[0][0] == times[0]:
+            return indicators
+
+        if fed[0][0] > times[0]:
+            stop = times.searchsorted(fed[-1][0], side='right')
+            fed.clear()
+            indicators = StreamingIndicators()
+            for candle_time, candle in zip(times[:stop], df.iloc[:stop].to_dict('records')):
+                self._feed(key, indicators, candle_time, candle)
+            return indicators
+
+        dropped = []
+        while fed and fed[0][0] < times[0]:
+            dropped.append(fed.popleft()[3:])
+        if len(fed) < REPLAY_CANDLES:
+            indicators = StreamingIndicators()
+            for _, high, low, close, volume in fed:
+                indicators.update({'high': high, 'low': low, 'close': close, 'volume': volume})
+            return indicators
+        recent = [candle[3:] for candle in itertools.islice(fed, len(fed) - REPLAY_CANDLES, None)]
+        indicators.rebase(dropped, recent)
+        return indicators
+
+    def _unseen_candles(self, key, option_df):
+        # The option candles after the last one fed to its indicators, as (times, records)
+        times = _times(option_df)
+        if len(times) and key in self.options:
+            self.options[key] = self._slide(key, self.options[key], times, option_df)
+        last_time = self.latest.get(key, (None,))[0]
+        start = 0 if last_time is None else times.searchsorted(last_time, side='right')
+        return [times[start:], option_df.iloc[start:].to_dict('records'), 0]
+
+    def _advance_option(self, key, unseen, until):
+        # Feed the unseen candles up to and including until
+        indicators = self.options.get(key)
+        if indicators is None:
+            indicators = self.options[key] = StreamingIndicators()
+        times, candles, position = unseen
+        stop = times.searchsorted(until, side='right')
+        for candle_time, candle in zip(times[position:stop], candles[position:stop]):
+            self.latest[key] = (candle_time, candle, self._feed(key, indicators, candle_time, candle))
+        unseen[2] = max(position, stop)
+
+    def process(self, futures_df, option_history):
+        """
+        Evaluate the futures bars after last_bar, in order, fetching option
+        history through option_history(strike_price, option_type) only for
+        the keys the signals need. Returns the new trades as a list of dicts.
+        """
+        times = _times(futures_df)
+        if len(times):
+            self.futures = self._slide("futures", self.futures, times, futures_df)
+        start = 0 if self.last_bar is None else times.searchsorted(self.last_bar, side='right')
+        unseen_options = {}
+        new_trades = []
+        for bar_time, candle in zip(times[start:], futures_df.iloc[start:].to_dict('records')):
+            futures_state = self._feed("futures", self.futures, bar_time, candle)
+            self.last_bar = bar_time
+            if not (futures_state['above_vwap'] or futures_state['below_vwap']):
+                continue
+
+            current_price = candle['close']
+            option_type = 'Call' if futures_state['above_vwap'] else 'Put'
+            strike_price = get_nearest_option(current_price, option_type, self.step)
+            key = f"{strike_price}-{option_type}"
+            if key not in unseen_options:
+                option_df = option_history(strike_price, option_type)
+                unseen_options[key] = None if option_df is None else self._unseen_candles(key, option_df)
+            if unseen_options[key] is None:
+                continue
+
+            self._advance_option(key, unseen_options[key], bar_time)
+            option_time, option_candle, option_state = self.latest.get(key, (None, None, None))
+            if option_time != bar_time:
+                continue
+
+            k, d = option_state['%K'], option_state['%D']
+            entered = is_entry(option_candle['close'], option_state['VWAP'], k, d)
+            if entered:
+                new_trades.append(trade_row(option_candle, current_price, option_type, strike_price, option_state['VWAP'], k, d))
+            self.flag_stochastic_fulfilled = next_flag(self.flag_stochastic_fulfilled, entered, k, d)
+
+        for trade in new_trades:
+            self.trade_log.append(trade)
+        return new_trades
+
+class StrategyCheckpoint:
+    """StrategyState pickled and zlib compressed to one file, replaced in one step after every cycle."""
+
+    def __init__(self, path=None):
+        self.path = path or CHECKPOINT_PATH
+
+    def load(self, step=100):
+        """The saved state, or a new one when there is none or it was saved for other settings."""
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return StrategyState(step)
+        except Exception as e:
+            log.warning(f"Ignoring unreadable strategy checkpoint {self.path}: {e}")
+            return StrategyState(step)
+
+        if getattr(state, 'version', None) != CHECKPOINT_VERSION or state.step != step:
+            log.info(f"Strategy checkpoint {self.path} was saved for other settings, starting over")
+            return StrategyState(step)
+        return state
+
+    def save(self, state):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def run_checkpointed(checkpoint=None, step=100,
+                     fetch_futures_history=fetch_banknifty_futures_history,
+                     fetch_options_history=fetch_banknifty_options_history, show_trades=True):
+    """
+    One cycle of the per-bar strategy that resumes from checkpoint (a
+    StrategyCheckpoint, CHECKPOINT_PATH by default) and saves it again, so
+    after a restart only the bars since the last cycle are evaluated.
+
+    The indicators follow the fetched window as it slides (see
+    StrategyState), and a checkpoint whose last bar is older than the
+    fetched history is dropped.
+
+    Returns the state, whose trade_log holds every trade since it started.
+    """
+    checkpoint = checkpoint or StrategyCheckpoint()
+    started = time.perf_counter()
+    state = checkpoint.load(step)
+
+    with metrics.timer("stage_seconds", stage="fetch"):
+        futures_df = fetch_futures_history()
+    if futures_df is None:
+        return state
+    if futures_df.empty:
+        checkpoint.save(state)
+        return state
+
+    if state.last_bar is not None and state.last_bar < _times(futures_df)[0]:
+        log.info("Strategy checkpoint is older than the fetched history, starting over")
+        state = StrategyState(step)
+    resumed_from = state.last_bar
+
+    with metrics.timer("stage_seconds", stage="evaluate_signals"):
+        new_trades = state.process(futures_df, fetch_options_history)
+    state.trade_log.flush()
+    checkpoint.save(state)
+
+    bars = len(futures_df) - (0 if resumed_from is None else _times(futures_df).searchsorted(resumed_from, side='right'))
+    log.info(
+        f"Evaluated {bars} new bars ({'resumed' if resumed_from is not None else 'fresh start'}), "
+        f"{len(new_trades)} new trades in {time.perf_counter() - started:.3f}s"
+    )
+
+    if show_trades:
+        print_valid_trades(state.trade_log)
+    metrics.export()
+    return state
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from rich.table import Table
+from rich.console import Console
+from api.breeze.candle_frame import CANDLE_TIMEZONE
+from strategies.stochastic.option_chain import OptionChain
+
+console = Console()
+
+# Exit levels as a fraction of the entry premium, None turns a rule off
+STOP_LOSS = 0.25
+TARGET = 0.5
+TRAILING_STOP = None
+# Open positions are closed at the close of the candle starting at this time
+SQUARE_OFF = pd.Timedelta(hours=15, minutes=15)
+
+EXIT_COLUMNS = [
+    'Entry Time', 'Option Type', 'Strike Price', 'Expiry', 'Entry Price', 'Exit Time',
+    'Exit Price', 'Exit Reason', 'Bars Held', 'P&L', 'Return %', 'MAE', 'MFE'
+]
+
+def _timestamps(values):
+    timestamps = pd.DatetimeIndex(pd.to_datetime(pd.Series(values)))
+    if timestamps.tz is None:
+        return timestamps.tz_localize(CANDLE_TIMEZONE)
+    return timestamps.tz_convert(CANDLE_TIMEZONE)
+
+def simulate_exits(trades, option_chain, stop_loss=STOP_LOSS, target=TARGET, trailing_stop=TRAILING_STOP,
+                   square_off=SQUARE_OFF, max_bars=None, quantity=1):
+    """
+    Exit every trade in trades (a trade log frame, or a TradeLog) against
+    the option candles in option_chain, all trades at once.
+
+    A trade buys its option at the close of the signal candle. On each
+    later candle of the same session the position is stopped out when the
+    low reaches the stop (entry less stop_loss, or the highest high so far
+    less trailing_stop when that is higher), takes profit when the high
+    reaches entry plus target, and is otherwise squared off at the close of
+    the square_off candle, after max_bars candles, or at the session's last
+    candle. A candle opening through a level fills at its open. Within a
+    candle the adverse move is assumed to come first: a candle reaching both
+    the stop and the target is stopped out.
+
+    Returns one row per trade found in the chain with its P&L, MAE and MFE
+    (adverse and favourable excursion from entry), all for quantity units.
+    Excursions stop at the exit. On the candle a target fills, MFE counts up
+    to the target; on the candle a stop fills, the high is taken to come
+    after the stop, so MFE counts only up to that candle's open.
+    """
+    if not isinstance(trades, pd.DataFrame):
+        trades = trades.to_frame()
+    if trades is None or trades.empty or not len(option_chain.strikes):
+        return pd.DataFrame(columns=EXIT_COLUMNS)
+
+    timestamps = _timestamps(trades['Timestamp'])
+    strike_prices = trades['Strike Price'].to_numpy(dtype=int)
+    right, strike, column, found = option_chain.locate(strike_prices, trades['Option Type'].to_numpy(), timestamps)
+    entry = np.where(found, option_chain.close[right, strike, column], np.nan)
+    found &= entry > 0
+    right, strike, column, entry, timestamps = right[found], strike[found], column[found], entry[found], timestamps[found]
+    trades = trades[found]
+    count = len(trades)
+    if not count:
+        return pd.DataFrame(columns=EXIT_COLUMNS)
+
+    # Candles after the entry up to the square off, one row per trade
+    last = option_chain.candles_until(right, strike, timestamps.normalize() + square_off)
+    bars = np.maximum(last - column - 1, 0)
+    if max_bars is not None:
+        bars = np.minimum(bars, max_bars)
+    offsets = np.arange(1, max(int(bars.max()), 1) + 1)
+    valid = offsets <= bars[:, None]
+    columns = np.minimum(column[:, None] + offsets, option_chain.time.shape[-1] - 1)
+    right_index, strike_index = right[:, None], strike[:, None]
+    open_, high, low, close = (
+        np.where(valid, getattr(option_chain, name)[right_index, strike_index, columns], np.nan)
+        for name in ('open', 'high', 'low', 'close')
+    )
+
+    entry_column = entry[:, None]
+    fixed_stop = entry_column * (1 - stop_loss) if stop_loss is not None else np.full_like(entry_column, -np.inf)
+    stop_level = np.broadcast_to(fixed_stop, high.shape)
+    if trailing_stop is not None:
+        # The trail follows the highest high before each candle, never the candle's own
+        peak = np.fmax.accumulate(np.where(valid, high, -np.inf), axis=1)
+        prior_peak = np.maximum(np.concatenate([entry_column, peak[:, :-1]], axis=1), entry_column)
+        stop_level = np.maximum(stop_level, prior_peak * (1 - trailing_stop))
+    target_level = entry_column * (1 + target) if target is not None else np.full_like(entry_column, np.inf)
+
+    stop_hit = valid & (low <= stop_level)
+    target_hit = valid & (high >= target_level) & ~stop_hit
+    hit = stop_hit | target_hit
+    exited = hit.any(axis=1)
+    exit_offset = np.where(exited, hit.argmax(axis=1), bars - 1)
+    held = exit_offset >= 0
+    exit_at = np.maximum(exit_offset, 0)
+    rows = np.arange(count)
+
+    exit_stop = exited & stop_hit[rows, exit_at]
+    exit_target = exited & ~exit_stop
+    bar_open, bar_close = open_[rows, exit_at], close[rows, exit_at]
+    exit_price = np.select(
+        [exit_stop, exit_target, held],
+        [
+            np.minimum(bar_open, stop_level[rows, exit_at]),
+            np.maximum(bar_open, np.broadcast_to(target_level, high.shape)[rows, exit_at]),
+            bar_close,
+        ],
+        entry
+    )
+    trailed = exit_stop & (stop_level[rows, exit_at] > fixed_stop[:, 0])
+    exit_reason = np.select(
+        [trailed, exit_stop, exit_target, (max_bars is not None) & (bars == max_bars) & held],
+        ["trailing_stop", "stop_loss", "target", "max_bars"],
+        "square_off"
+    )
+
+    # Excursions run to the exit, the exit candle only as far as the exit price (or a stop's open)
+    through_exit = valid & (offsets - 1 <= exit_offset[:, None])
+    exit_cell = through_exit & (offsets - 1 == exit_offset[:, None])
+    high_seen = np.select(
+        [exit_cell & exit_target[:, None], exit_cell & exit_stop[:, None]],
+        [np.minimum(high, exit_price[:, None]), np.minimum(high, open_)],
+        high
+    )
+    low_seen = np.where(exit_cell & exit_stop[:, None], np.maximum(low, exit_price[:, None]), low)
+    mfe = np.maximum(np.max(np.where(through_exit, high_seen, -np.inf), axis=1), entry) - entry
+    mae = np.minimum(np.min(np.where(through_exit, low_seen, np.inf), axis=1), entry) - entry
+
+    exit_columns = np.where(held, column + 1 + exit_at, column)
+    exit_time = pd.to_datetime(option_chain.time[right, strike, exit_columns], unit="s", utc=True)
+    pnl = exit_price - entry
+    return pd.DataFrame({
+        'Entry Time': timestamps,
+        'Option Type': trades['Option Type'].to_numpy(),
+        'Strike Price': strike_prices[found],
+        'Expiry': trades['Expiry'].to_numpy() if 'Expiry' in trades else option_chain.expiry[right, strike],
+        'Entry Price': entry,
+        'Exit Time': exit_time.tz_convert(CANDLE_TIMEZONE),
+        'Exit Price': exit_price,
+        'Exit Reason': exit_reason,
+        'Bars Held': np.where(held, exit_at + 1, 0),
+        'P&L': pnl * quantity,
+        'Return %': pnl / entry * 100,
+        'MAE': mae * quantity,
+        'MFE': mfe * quantity,
+    })
+
+def simulate_trade_log(trade_log, historic_options_data, **exit_rules):
+    """simulate_exits for trades evaluated on historic_options_data ("strike-Right" keyed frames)."""
+    return simulate_exits(trade_log, OptionChain(historic_options_data), **exit_rules)
+
+def exit_stats(results):
+    """Hit rate, expectancy (mean P&L per trade) and drawdown of the equity curve in exit order."""
+    if results is None or results.empty:
+        return {'Trades': 0}
+    pnl = results.sort_values('Exit Time')['P&L'].to_numpy(dtype=float)
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    equity = np.cumsum(pnl)
+    drawdown = equity - np.maximum.accumulate(np.maximum(equity, 0))
+    return {
+        'Trades': len(pnl),
+        'Hit Rate %': len(wins) / len(pnl) * 100,
+        'Total P&L': equity[-1],
+        'Expectancy': pnl.mean(),
+        'Average Win': wins.mean() if len(wins) else 0.0,
+        'Average Loss': losses.mean() if len(losses) else 0.0,
+        'Profit Factor': wins.sum() / -losses.sum() if losses.sum() < 0 else np.inf,
+        'Max Drawdown': drawdown.min(),
+        'Mean MAE': results['MAE'].mean(),
+        'Mean MFE': results['MFE'].mean(),
+    }
+
+def print_exit_summary(results):
+    stats = exit_stats(results)
+    if not stats['Trades']:
+        console.print("[bold red]No trades to simulate exits for.[/bold red]")
+        return
+
+    reasons = results.groupby('Exit Reason').agg(Trades=('P&L', 'size'), PnL=('P&L', 'sum'), Mean=('P&L', 'mean'))
+    table = Table(title="Exits")
+    for column in ['Exit Reason', 'Trades', 'P&L', 'Mean P&L']:
+        table.add_column(column, style="cyan")
+    for reason, row in zip(reasons.index, reasons.itertuples(index=False)):
+        table.add_row(reason, str(row.Trades), f"{row.PnL:.2f}", f"{row.Mean:.2f}")
+    console.print(table)
+
+    table = Table(title="Trade Statistics")
+    table.add_column("Statistic", style="cyan")
+    table.add_column("Value", style="cyan")
+    for name, value in stats.items():
+        table.add_row(name, str(value) if name == 'Trades' else f"{value:.2f}")
+    console.print(table)
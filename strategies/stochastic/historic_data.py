@@ -1,64 +1,111 @@
-﻿from api.breeze.breeze import BreezeAPI
+﻿from api.breeze.breeze import get_breeze_api
+from api.breeze.candle_cache import CandleCache
+from api.breeze.candle_frame import to_candle_frame, bytes_per_candle
+from api.breeze.resample import DerivedFrameCache, base_interval_for
 from api.breeze import stock_codes
-import pandas as pd
 from datetime import datetime, timedelta
 import logging
+import threading
 from rich.logging import RichHandler
 from rich.console import Console
 
 log = logging.getLogger(__name__)
 console = Console()
 
-def fetch_banknifty_futures_history():
-    breeze = BreezeAPI()
-    breeze.connect()
+# Candles already downloaded are served from disk, only the missing range goes to Breeze.
+# Opened on the first fetch, importing this module touches no files.
+_candle_cache = None
+_candle_cache_lock = threading.Lock()
+# Intervals Breeze doesn't serve (or every minute interval, with CANDLE_BASE_INTERVAL=1minute) are resampled from 1 minute candles
+derived_frames = DerivedFrameCache()
 
-    # Set the dates
-    to_date = datetime.today()
-    from_date = (to_date - timedelta(days=3))
-    expiry_date = datetime.strptime("2024-08-28", "%Y-%m-%d")
+FUTURES_EXPIRY_DATE = datetime.strptime("2024-08-28", "%Y-%m-%d")
+OPTIONS_EXPIRY_DATE = datetime.strptime("2024-08-21", "%Y-%m-%d")
+
+def get_candle_cache():
+    """The CandleCache the fetchers use, at CANDLE_CACHE_PATH unless set_candle_cache picked another."""
+    global _candle_cache
+    if _candle_cache is None:
+        with _candle_cache_lock:
+            if _candle_cache is None:
+                _candle_cache = CandleCache()
+    return _candle_cache
+
+def set_candle_cache(cache):
+    """Point the fetchers at cache (None opens the default again on next use). Returns the previous one."""
+    global _candle_cache
+    with _candle_cache_lock:
+        previous, _candle_cache = _candle_cache, cache
+    return previous
+
+def _derive(df, cache_key, interval, base_interval):
+    if not base_interval:
+        return df
+    return derived_frames.get(cache_key, interval, df)
 
-    data = breeze.get_futures_data(
-        stock_code=stock_codes.BANK_NIFTY,
+def fetch_futures_history(from_date, to_date, expiry_date, stock_code=stock_codes.BANK_NIFTY, interval="5minute"):
+    breeze = get_breeze_api()
+    base_interval = base_interval_for(interval)
+
+    data = get_candle_cache().get_futures_data(
+        breeze,
+        stock_code=stock_code,
         from_date=from_date,
         to_date=to_date,
-        interval="5minute",
+        interval=base_interval or interval,
         expiry_date=expiry_date
     )
 
     if data:
-        df = pd.DataFrame(data['Success'])
-        console.print("count", df.shape[0])
+        cache_key = CandleCache.make_key(stock_code, "futures", 0, "others", expiry_date, base_interval or interval)
+        df = _derive(to_candle_frame(data['Success']), cache_key, interval, base_interval)
+        console.print("count", df.shape[0], f"({bytes_per_candle(df):.0f} bytes per candle)")
         return df
     else:
-        log.exception(f"An error occurred while fetching Bank Nifty futures data")
+        log.exception(f"An error occurred while fetching {stock_code} futures data")
         return None
 
-def fetch_banknifty_options_history(strike_price, option_type, expiry_date=None):
-    breeze = BreezeAPI()
-    breeze.connect()
-
-    # Set the dates
-    to_date = datetime.today()
-    from_date = (to_date - timedelta(days=5))
-
-    if not expiry_date:
-        expiry_date = datetime.strptime("2024-08-21", "%Y-%m-%d")
+def fetch_options_history(strike_price, option_type, from_date, to_date, expiry_date, stock_code=stock_codes.BANK_NIFTY, interval="5minute"):
+    breeze = get_breeze_api()
+    base_interval = base_interval_for(interval)
 
-    data = breeze.get_option_data(
-        stock_code=stock_codes.BANK_NIFTY,
+    data = get_candle_cache().get_option_data(
+        breeze,
+        stock_code=stock_code,
         strike_price=strike_price,
         option_type=option_type,
         from_date=from_date,
         to_date=to_date,
-        interval="5minute",
+        interval=base_interval or interval,
         expiry_date=expiry_date
     )
 
     if data:
-        df = pd.DataFrame(data['Success'])
-        console.print("count", df.shape[0])
+        cache_key = CandleCache.make_key(stock_code, "options", strike_price, option_type, expiry_date, base_interval or interval)
+        df = _derive(to_candle_frame(data['Success']), cache_key, interval, base_interval)
+        console.print("count", df.shape[0], f"({bytes_per_candle(df):.0f} bytes per candle)")
         return df
     else:
-        log.exception(f"An error occurred while fetching Bank Nifty futures data")
+        log.exception(f"An error occurred while fetching {stock_code} options data")
         return None
+
+def fetch_recent_futures_history(stock_code, expiry_date, days=3, interval="5minute"):
+    to_date = datetime.today()
+    from_date = (to_date - timedelta(days=days))
+
+    return fetch_futures_history(from_date, to_date, expiry_date, stock_code=stock_code, interval=interval)
+
+def fetch_recent_options_history(stock_code, strike_price, option_type, expiry_date, days=5, interval="5minute"):
+    to_date = datetime.today()
+    from_date = (to_date - timedelta(days=days))
+
+    return fetch_options_history(strike_price, option_type, from_date, to_date, expiry_date, stock_code=stock_code, interval=interval)
+
+def fetch_banknifty_futures_history(interval="5minute"):
+    return fetch_recent_futures_history(stock_codes.BANK_NIFTY, FUTURES_EXPIRY_DATE, days=3, interval=interval)
+
+def fetch_banknifty_options_history(strike_price, option_type, expiry_date=None, interval="5minute"):
+    if not expiry_date:
+        expiry_date = OPTIONS_EXPIRY_DATE
+
+    return fetch_recent_options_history(stock_codes.BANK_NIFTY, strike_price, option_type, expiry_date, days=5, interval=interval)
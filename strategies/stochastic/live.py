@@ -0,0 +1,291 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from datetime import time as session_time
+import pandas as pd
+import pytz
+from rich.console import Console
+from api.breeze import stock_codes
+from api.breeze.candle_cache import CANDLE_DATETIME_FORMAT
+from api.breeze.candle_frame import CANDLE_TIMEZONE
+from api.breeze.breeze import get_breeze_api
+from api.breeze.tick_feed import BreezeTickSource, ReplayTickSource, parse_tick_time, tick_instrument_key
+from strategies.stochastic.historic_data import (
+    fetch_banknifty_futures_history, fetch_banknifty_options_history, FUTURES_EXPIRY_DATE, OPTIONS_EXPIRY_DATE
+)
+from strategies.stochastic.stochastic import get_nearest_option, is_entry, next_flag, trade_row
+from strategies.stochastic.streaming import StreamingIndicators
+from strategies.stochastic.trade_log import TradeLog
+
+log = logging.getLogger(__name__)
+console = Console()
+
+SESSION_OPEN = session_time(9, 15)
+EXCHANGE_TIMEZONE = pytz.timezone(CANDLE_TIMEZONE)
+
+def exchange_now():
+    # Naive exchange time, what tick times and candle buckets use whatever the host timezone
+    return datetime.now(EXCHANGE_TIMEZONE).replace(tzinfo=None)
+
+def candle_bucket_start(tick_time, interval):
+    # Buckets are aligned to the session open, ticks before it go to the first bucket
+    session_open = datetime.combine(tick_time.date(), SESSION_OPEN)
+    if tick_time < session_open:
+        return session_open
+    return session_open + ((tick_time - session_open) // interval) * interval
+
+class CandleAggregator:
+    """Builds OHLCV candles for one instrument out of its ticks."""
+
+    def __init__(self, interval_minutes=5):
+        self.interval = timedelta(minutes=interval_minutes)
+        self.candle = None
+        self.last_total_volume = None
+
+    def update(self, tick):
+        price = float(tick['last'])
+
+        # 'ttq' is the day's traded quantity so far, fall back to the last traded quantity
+        if tick.get('ttq') is not None:
+            total_volume = int(tick['ttq'])
+            volume = total_volume - self.last_total_volume if self.last_total_volume is not None else int(tick.get('ltq') or 0)
+            self.last_total_volume = total_volume
+        else:
+            volume = int(tick.get('ltq') or 0)
+
+        if self.candle is None:
+            self.candle = {
+                'datetime': candle_bucket_start(parse_tick_time(tick), self.interval).strftime(CANDLE_DATETIME_FORMAT),
+                'open': price,
+                'high': price,
+                'low': price,
+                'close': price,
+                'volume': max(volume, 0),
+                'expiry_date': tick.get('expiry_date'),
+            }
+        else:
+            self.candle['high'] = max(self.candle['high'], price)
+            self.candle['low'] = min(self.candle['low'], price)
+            self.candle['close'] = price
+            self.candle['volume'] += max(volume, 0)
+
+    def close(self):
+        candle, self.candle = self.candle, None
+        return candle
+
+class LiveStrategy:
+    """
+    Runs the stochastic strategy on a tick feed. Ticks are aggregated into
+    candles in-process and the strategy is evaluated as soon as a candle
+    closes, using streaming indicators seeded from the REST history.
+
+    Option history for strikes not tracked yet is fetched on a worker
+    thread, so the tick callback never waits on REST calls; a signal on
+    such a strike is checked once its history is in. With seed=False
+    nothing is fetched and the indicators warm up from the ticks alone,
+    which is how recorded sessions are replayed offline.
+    """
+
+    def __init__(self, tick_source, interval_minutes=5, ladder=2, step=100, on_trade=None,
+                 fetch_futures_history=fetch_banknifty_futures_history,
+                 fetch_options_history=fetch_banknifty_options_history, seed=True):
+        self.tick_source = tick_source
+        self.interval = timedelta(minutes=interval_minutes)
+        self.interval_minutes = interval_minutes
+        self.ladder = ladder
+        self.step = step
+        self.on_trade = on_trade or self._print_trade
+        self.fetch_futures_history = fetch_futures_history
+        self.fetch_options_history = fetch_options_history
+        self.seed = seed
+
+        self.aggregators = {}
+        self.indicators = {}
+        self.latest = {}
+        self.bar_start = None
+        self.flag_stochastic_fulfilled = False
+        self.trades = TradeLog()
+        self._lock = threading.RLock()
+        # Keys whose history is being fetched, with the checks waiting on them
+        self._pending = {}
+        self._fetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-option-history")
+
+    def _seed(self, key, history_df, before):
+        # Replay closed candles from the REST history so indicators start warm
+        indicators = StreamingIndicators()
+        self.indicators[key] = indicators
+        self.aggregators[key] = CandleAggregator(self.interval_minutes)
+        if history_df is None:
+            return
+        for candle in history_df.to_dict('records'):
+            # History carries the exchange timezone, bars here are naive local time
+            candle_time = pd.Timestamp(candle['datetime']).tz_localize(None)
+            if before is not None and candle_time >= before:
+                break
+            self.latest[key] = (candle_time.strftime(CANDLE_DATETIME_FORMAT), candle, indicators.update(candle))
+
+    def _add_option(self, strike_price, option_type, before, on_ready=None):
+        # Called with the lock held. on_ready runs (under the lock) once the option is tracked.
+        key = f"{strike_price}-{option_type}"
+        if key in self.indicators:
+            if on_ready:
+                on_ready()
+            return
+        if key in self._pending:
+            if on_ready:
+                self._pending[key].append(on_ready)
+            return
+        if not self.seed:
+            self._seed(key, None, before)
+            self.tick_source.subscribe("options", OPTIONS_EXPIRY_DATE, strike_price, option_type)
+            if on_ready:
+                on_ready()
+            return
+        self._pending[key] = [on_ready] if on_ready else []
+        self._fetcher.submit(self._fetch_option, strike_price, option_type, before)
+
+    def _fetch_option(self, strike_price, option_type, before):
+        key = f"{strike_price}-{option_type}"
+        # The REST call happens without the lock, ticks keep flowing meanwhile
+        try:
+            history_df = self.fetch_options_history(strike_price, option_type)
+        except Exception as e:
+            log.error(f"Failed to fetch history for {key}: {e}")
+            history_df = None
+        with self._lock:
+            self._seed(key, history_df, before)
+            self.tick_source.subscribe("options", OPTIONS_EXPIRY_DATE, strike_price, option_type)
+            for on_ready in self._pending.pop(key, []):
+                on_ready()
+
+    def _ensure_ladder(self, current_price, before):
+        for option_type in ('Call', 'Put'):
+            nearest = get_nearest_option(current_price, option_type, self.step)
+            for offset in range(-self.ladder, self.ladder + 1):
+                self._add_option(nearest + offset * self.step, option_type, before)
+
+    def start(self, now=None):
+        if not self.seed:
+            # The ladder is laid out around the first futures tick instead
+            self._seed("futures", None, None)
+            self.tick_source.start(self.on_tick)
+            self.tick_source.subscribe("futures", FUTURES_EXPIRY_DATE)
+            return
+
+        bucket = candle_bucket_start(now or exchange_now(), self.interval)
+        futures_df = self.fetch_futures_history()
+        self._seed("futures", futures_df, bucket)
+
+        self.tick_source.start(self.on_tick)
+        self.tick_source.subscribe("futures", FUTURES_EXPIRY_DATE)
+        if futures_df is not None and not futures_df.empty:
+            with self._lock:
+                self._ensure_ladder(float(futures_df['close'].iloc[-1]), bucket)
+
+    def wait_for_history(self):
+        """Block until the option history fetches queued so far are done."""
+        self._fetcher.submit(lambda: None).result()
+
+    def stop(self):
+        self._fetcher.shutdown(wait=True)
+
+    def on_tick(self, tick):
+        with self._lock:
+            tick_time = parse_tick_time(tick)
+            bucket = candle_bucket_start(tick_time, self.interval)
+            if self.bar_start is not None and bucket > self.bar_start:
+                self._close_bar()
+            if self.bar_start is None:
+                self.bar_start = bucket
+
+            key = tick_instrument_key(tick)
+            if key in self.aggregators:
+                self.aggregators[key].update(tick)
+            if not self.seed and key == "futures" and len(self.indicators) == 1:
+                # Not seeded from history, the first futures tick decides the ladder
+                self._ensure_ladder(float(tick['last']), None)
+
+    def flush(self, now=None):
+        # Closes the current candle once its time is up even if no new tick arrived
+        with self._lock:
+            if self.bar_start is not None and (now is None or now >= self.bar_start + self.interval):
+                self._close_bar()
+
+    def _close_bar(self):
+        bar_datetime = self.bar_start.strftime(CANDLE_DATETIME_FORMAT)
+        for key, aggregator in self.aggregators.items():
+            candle = aggregator.close()
+            if candle is not None:
+                self.latest[key] = (candle['datetime'], candle, self.indicators[key].update(candle))
+        self.bar_start = None
+        self._evaluate(bar_datetime)
+
+    def _evaluate(self, bar_datetime):
+        if self.latest.get("futures", (None,))[0] != bar_datetime:
+            return
+        _, futures_candle, futures_state = self.latest["futures"]
+        if not (futures_state['above_vwap'] or futures_state['below_vwap']):
+            return
+
+        current_price = float(futures_candle['close'])
+        option_type = 'Call' if futures_state['above_vwap'] else 'Put'
+        strike_price = get_nearest_option(current_price, option_type, self.step)
+        next_bar = pd.Timestamp(bar_datetime) + self.interval
+        log.info(f"Checking at {bar_datetime=} and {current_price=}")
+
+        self._add_option(
+            strike_price, option_type, next_bar,
+            on_ready=lambda: self._check_option(bar_datetime, current_price, option_type, strike_price)
+        )
+        self._ensure_ladder(current_price, next_bar)
+
+    def _check_option(self, bar_datetime, current_price, option_type, strike_price):
+        option_datetime, option_candle, option_state = self.latest.get(f"{strike_price}-{option_type}", (None, None, None))
+        if option_datetime != bar_datetime:
+            return
+
+        k, d = option_state['%K'], option_state['%D']
+        entered = is_entry(option_candle['close'], option_state['VWAP'], k, d)
+        self.flag_stochastic_fulfilled = next_flag(self.flag_stochastic_fulfilled, entered, k, d)
+        if entered:
+            # Seeded candles keep the exchange timezone, the trade uses the bar time
+            option_candle = {**option_candle, 'datetime': option_datetime}
+            trade = trade_row(option_candle, current_price, option_type, strike_price, option_state['VWAP'], k, d)
+            self.trades.append(trade)
+            self.on_trade(trade)
+
+    def _print_trade(self, trade):
+        console.print(f"[bold green]Trade signal[/bold green] {trade}")
+
+def run_live(replay_address=None, record_path=None, flush_seconds=1):
+    """
+    Stream ticks and evaluate the strategy on every candle close. With a
+    replay_address (host, port) the ticks come from a TickReplayServer and
+    the run ends when the recording does.
+    """
+    if replay_address:
+        tick_source = ReplayTickSource(replay_address)
+    else:
+        tick_source = BreezeTickSource(get_breeze_api(), stock_codes.BANK_NIFTY, record_path=record_path)
+
+    # A replay runs offline, its indicators warm up from the recorded ticks
+    strategy = LiveStrategy(tick_source, seed=not replay_address)
+    strategy.start()
+    try:
+        if replay_address:
+            # Replayed ticks carry their own clock, so candles close on tick time only
+            tick_source.wait()
+            strategy.flush()
+        else:
+            while True:
+                strategy.flush(exchange_now())
+                time.sleep(flush_seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tick_source.stop()
+        strategy.stop()
+        strategy.trades.close()
+    return strategy.trades
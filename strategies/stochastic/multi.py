@@ -0,0 +1,140 @@
+import os
+import time
+import logging
+import calendar
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from rich.table import Table
+from rich.console import Console
+from api.breeze import stock_codes
+from strategies.stochastic.historic_data import fetch_recent_futures_history, fetch_recent_options_history
+from strategies.stochastic.stochastic import run_strategy, print_valid_trades
+from strategies.stochastic.backtest import weekly_expiry, monthly_expiry
+from strategies.stochastic.option_cache import OptionHistoryCache, OPTION_CACHE_BYTES
+from strategies.stochastic.trade_log import TradeLog
+
+log = logging.getLogger(__name__)
+console = Console()
+
+# Per underlying strike step and expiry rules. Options expire weekly or
+# monthly on expiry_weekday, futures on the last expiry_weekday of the
+# month. 'futures_expiry' / 'options_expiry' dates override the rules.
+UNDERLYINGS = {
+    stock_codes.BANK_NIFTY: {
+        'step': 100,
+        'options_expiry_cycle': 'weekly',
+        'expiry_weekday': calendar.WEDNESDAY,
+    },
+    stock_codes.ICICI_BANK: {
+        'step': 10,
+        'options_expiry_cycle': 'monthly',
+        'expiry_weekday': calendar.THURSDAY,
+    },
+}
+# Every underlying has to finish a cycle within one candle
+BAR_SECONDS = 5 * 60
+# Option history per underlying (strike keys overlap between underlyings), sharing one memory budget
+option_caches = {
+    stock_code: OptionHistoryCache(OPTION_CACHE_BYTES // len(UNDERLYINGS)) for stock_code in UNDERLYINGS
+}
+
+def _as_datetime(day):
+    return day if isinstance(day, datetime) else datetime.combine(day, datetime.min.time())
+
+def underlying_expiries(config, today=None):
+    today = today or datetime.today()
+    weekday = config['expiry_weekday']
+    futures_expiry = config.get('futures_expiry') or monthly_expiry(today, weekday)
+    options_expiry = config.get('options_expiry')
+    if not options_expiry:
+        expiry_rule = weekly_expiry if config['options_expiry_cycle'] == 'weekly' else monthly_expiry
+        options_expiry = expiry_rule(today, weekday)
+    return _as_datetime(futures_expiry), _as_datetime(options_expiry)
+
+def _run_underlying(stock_code, config, vectorized, option_workers, trade_log):
+    futures_expiry, options_expiry = underlying_expiries(config)
+    started = time.perf_counter()
+    run_strategy(
+        vectorized=vectorized,
+        max_workers=option_workers,
+        trade_log=trade_log,
+        step=config['step'],
+        fetch_futures_history=partial(fetch_recent_futures_history, stock_code, futures_expiry),
+        fetch_options_history=lambda strike_price, option_type: fetch_recent_options_history(
+            stock_code, strike_price, option_type, options_expiry
+        ),
+        show_trades=False,
+        option_cache=option_caches[stock_code],
+    )
+    return time.perf_counter() - started
+
+def run_underlyings(underlyings=None, vectorized=True, option_workers=4):
+    """
+    One strategy cycle for each underlying, run concurrently on a thread
+    pool. They all go through the same Breeze session, rate limiter and
+    candle cache. Defaults to MULTI_UNDERLYINGS (comma separated stock
+    codes) or every configured underlying.
+
+    Returns {stock_code: {'trade_log': TradeLog, 'seconds': cycle time}}.
+    """
+    if underlyings is None:
+        configured = os.getenv('MULTI_UNDERLYINGS')
+        underlyings = [code.strip() for code in configured.split(",")] if configured else list(UNDERLYINGS)
+    unknown = [code for code in underlyings if code not in UNDERLYINGS]
+    if unknown:
+        raise ValueError(f"No strike step / expiry configured for {unknown}")
+
+    started = time.perf_counter()
+    trade_logs = {stock_code: TradeLog() for stock_code in underlyings}
+    with ThreadPoolExecutor(max_workers=len(underlyings)) as executor:
+        futures = {
+            stock_code: executor.submit(
+                _run_underlying, stock_code, UNDERLYINGS[stock_code], vectorized, option_workers, trade_logs[stock_code]
+            )
+            for stock_code in underlyings
+        }
+        results = {}
+        for stock_code, future in futures.items():
+            try:
+                seconds = future.result()
+            except Exception as e:
+                log.exception(f"Strategy cycle for {stock_code} failed: {e}")
+                seconds = None
+            results[stock_code] = {'trade_log': trade_logs[stock_code], 'seconds': seconds}
+    log.info(f"Ran {len(underlyings)} underlyings in {time.perf_counter() - started:.2f}s")
+    return results
+
+def print_cycle_times(results, wall_seconds=None, bar_seconds=BAR_SECONDS):
+    table = Table(title="Strategy Cycle per Underlying")
+    for column in ['Underlying', 'Trades', 'Cycle Seconds', '% of Bar']:
+        table.add_column(column, style="cyan")
+    for stock_code, result in results.items():
+        seconds = result['seconds']
+        table.add_row(
+            stock_code,
+            str(len(result['trade_log'])),
+            "failed" if seconds is None else f"{seconds:.2f}",
+            "" if seconds is None else f"{100 * seconds / bar_seconds:.1f}%",
+        )
+    console.print(table)
+
+    cycle_seconds = [result['seconds'] for result in results.values() if result['seconds'] is not None]
+    if cycle_seconds and wall_seconds:
+        # Concurrent underlyings overlap, so the wall time decides how many fit into a bar
+        per_underlying = wall_seconds / len(cycle_seconds)
+        console.print(
+            f"[bold green]{len(cycle_seconds)} underlyings in {wall_seconds:.2f}s, "
+            f"about {int(bar_seconds // per_underlying)} fit in a {bar_seconds // 60} minute bar[/bold green]"
+        )
+
+if __name__ == "__main__":
+    logging.basicConfig(level="INFO", format="%(message)s")
+    started = time.perf_counter()
+    results = run_underlyings()
+    wall_seconds = time.perf_counter() - started
+    for stock_code, result in results.items():
+        console.print(f"[bold]{stock_code}[/bold]")
+        print_valid_trades(result['trade_log'])
+        result['trade_log'].close()
+    print_cycle_times(results, wall_seconds)
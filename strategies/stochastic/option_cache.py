@@ -0,0 +1,194 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from datetime import datetime
+import pytz
+from api.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# Memory the cached option frames may take before the least recently used are dropped
+OPTION_CACHE_BYTES = int(float(os.getenv('OPTION_CACHE_MB', 256)) * 1024 * 1024)
+# Frames are reused until the end of the refresh period (aligned to the clock,
+# so one candle with the default) they were fetched in, then fetched again
+OPTION_CACHE_REFRESH_SECONDS = float(os.getenv('OPTION_CACHE_REFRESH_SECONDS', 5 * 60))
+EXPIRY_TIMEZONE = pytz.timezone("Asia/Kolkata")
+EXPIRY_DATE_FORMAT = "%d-%b-%Y"
+
+def frame_bytes(option_df):
+    if option_df is None:
+        return 0
+    return int(option_df.memory_usage(index=True, deep=True).sum())
+
+def frame_expiry(option_df):
+    """The contract's expiry date from its last candle, None when unknown."""
+    if option_df is None or option_df.empty or 'expiry_date' not in option_df:
+        return None
+    try:
+        return datetime.strptime(str(option_df['expiry_date'].iloc[-1]), EXPIRY_DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+class OptionHistoryCache(MutableMapping):
+    """
+    Drop-in for the historic_options_data dict ("strike-Right" keys, candle
+    frames or None for failed fetches) that stays within max_bytes. Frames
+    are evicted least recently used first, contracts are purged once the
+    day after their expiry starts, and a frame fetched in an earlier refresh
+    period than now counts as missing (and is dropped as stale) so the next
+    cycle sees new candles. Keys inside a pinned() block are neither evicted
+    nor purged, so a cycle keeps every frame it fetched.
+
+    `key in cache` is the lookup every caller does before fetching, so it is
+    what the hit and miss counts measure. Sizes are taken when a frame is
+    stored.
+    """
+
+    def __init__(self, max_bytes=OPTION_CACHE_BYTES, refresh_seconds=OPTION_CACHE_REFRESH_SECONDS, clock=time.time):
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.stale = 0
+        self._entries = OrderedDict()
+        self._pinned = Counter()
+        self._lock = threading.RLock()
+        self._purged_on = None
+
+    def _period(self, timestamp):
+        if not self.refresh_seconds:
+            return 0
+        return int(timestamp // self.refresh_seconds)
+
+    def _drop(self, key):
+        _, size, _, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def _is_fresh(self, key, now):
+        return self._entries[key][3] == self._period(now)
+
+    def purge_expired(self, now=None):
+        """Drop every contract whose expiry date has passed. Returns how many were dropped."""
+        now = self.clock() if now is None else now
+        today = datetime.fromtimestamp(now, EXPIRY_TIMEZONE).date()
+        with self._lock:
+            expired = [
+                key for key, (_, _, expiry, _) in self._entries.items()
+                if expiry is not None and expiry < today and key not in self._pinned
+            ]
+            for key in expired:
+                self._drop(key)
+            self._purged_on = today
+            self.expired += len(expired)
+        if expired:
+            metrics.inc("option_cache_events", len(expired), event="expired")
+            log.info(f"Purged {len(expired)} expired option histories")
+        return len(expired)
+
+    def _purge_daily(self, now):
+        if self._purged_on != datetime.fromtimestamp(now, EXPIRY_TIMEZONE).date():
+            self.purge_expired(now)
+
+    def __contains__(self, key):
+        now = self.clock()
+        with self._lock:
+            self._purge_daily(now)
+            found = key in self._entries and self._is_fresh(key, now)
+            stale = key in self._entries and not found
+            if stale:
+                self._drop(key)
+                self.stale += 1
+            if found:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.inc("option_cache_events", event="hit" if found else "miss")
+        if stale:
+            metrics.inc("option_cache_events", event="stale")
+        return found
+
+    def __getitem__(self, key):
+        with self._lock:
+            option_df = self._entries[key][0]
+            self._entries.move_to_end(key)
+            return option_df
+
+    def __setitem__(self, key, option_df):
+        now = self.clock()
+        size = frame_bytes(option_df)
+        evicted = 0
+        with self._lock:
+            self._purge_daily(now)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (option_df, size, frame_expiry(option_df), self._period(now))
+            self.bytes += size
+            # The frame just stored and pinned frames stay, even over budget
+            if self.bytes > self.max_bytes:
+                for candidate in list(self._entries):
+                    if self.bytes <= self.max_bytes:
+                        break
+                    if candidate != key and candidate not in self._pinned:
+                        self._drop(candidate)
+                        evicted += 1
+            self.evictions += evicted
+            over_budget = self.bytes > self.max_bytes
+        if evicted:
+            metrics.inc("option_cache_events", evicted, event="eviction")
+        if over_budget:
+            log.warning(f"Option cache holds {self.bytes / 2**20:.1f}MB of frames in use, over its {self.max_bytes / 2**20:.1f}MB budget")
+
+    @contextmanager
+    def pinned(self, keys):
+        """Keep keys (e.g. every strike one cycle plans to use) from eviction and purging inside the block."""
+        keys = list(keys)
+        with self._lock:
+            self._pinned.update(keys)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._pinned.subtract(keys)
+                self._pinned += Counter()
+
+    def __delitem__(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def __iter__(self):
+        # A snapshot, so reading the items doesn't trip over the LRU reordering
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expired': self.expired,
+                'stale': self.stale,
+            }
+
+# Shared by run_strategy calls in this process (the Bank Nifty chain by default)
+option_history_cache = OptionHistoryCache()
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from strategies.stochastic import indicators
+
+RIGHTS = ('Call', 'Put')
+# Padding after the last candle of a contract, never matches a real timestamp
+_PADDING = np.iinfo(np.int64).max
+
+def _seconds(values):
+    # Breeze timestamps are whole seconds, which keeps the lookup keys small
+    return pd.DatetimeIndex(values).as_unit("s").asi8
+
+def ladder_strikes(prices, step=100, ladder=2):
+    """Every strike from ladder steps below the lowest price to ladder steps above the highest."""
+    prices = np.asarray(prices, dtype=float)
+    low = (np.floor(np.nanmin(prices) / step) - ladder) * step
+    high = (np.ceil(np.nanmax(prices) / step) + ladder) * step
+    return np.arange(low, high + step, step).astype(int)
+
+class OptionChain:
+    """
+    Option history for a set of strikes and both rights as dense arrays of
+    shape (right, strike, candle), with VWAP, %K and %D computed for every
+    contract in one vectorized call each.
+
+    Each contract's candles are laid out in order from the first column,
+    padded with NaN after its last candle. When the contracts trade every
+    bar that is the strike x timestamp grid, and a contract that missed
+    some bars still gets the same rolling windows as its own DataFrame
+    would. locate() turns (strike, right, timestamp) lookups into array
+    indices.
+    """
+
+    def __init__(self, option_dfs, k_period=5, d_period=3):
+        # option_dfs maps "strike-Right" (the historic_options_data keys) to candle frames
+        frames = {}
+        for key, option_df in option_dfs.items():
+            if option_df is None or option_df.empty:
+                continue
+            strike_price, option_type = key.split("-")
+            frames[(int(strike_price), option_type)] = option_df
+
+        self.strikes = np.array(sorted({strike_price for strike_price, _ in frames}), dtype=int)
+        length = max((len(option_df) for option_df in frames.values()), default=0)
+        shape = (len(RIGHTS), len(self.strikes), length)
+
+        self.open, self.high, self.low, self.close = (np.full(shape, np.nan) for _ in range(4))
+        self.volume = np.zeros(shape)
+        self.time = np.full(shape, _PADDING, dtype=np.int64)
+        self.lengths = np.zeros(shape[:2], dtype=int)
+        self.expiry = np.full(shape[:2], None, dtype=object)
+
+        for (strike_price, option_type), option_df in frames.items():
+            right, strike = RIGHTS.index(option_type), np.searchsorted(self.strikes, strike_price)
+            candles = len(option_df)
+            for column in ('open', 'high', 'low', 'close', 'volume'):
+                getattr(self, column)[right, strike, :candles] = option_df[column].to_numpy(dtype=float)
+            self.time[right, strike, :candles] = _seconds(option_df['datetime'])
+            self.lengths[right, strike] = candles
+            if 'expiry_date' in option_df:
+                self.expiry[right, strike] = option_df['expiry_date'].iloc[-1]
+
+        # Padding volume is 0 and its close NaN, so it never moves a real candle's values
+        self.vwap = indicators.vwap(self.close, self.volume)
+        self.k, self.d = indicators.stochastic(self.high, self.low, self.close, k_period, d_period)
+
+        # Every row gets its own key range and is sorted by time within it,
+        # so one searchsorted over the flattened keys serves every lookup
+        real = self.time != _PADDING
+        self._first = self.time[real].min() if real.any() else 0
+        self._span = (self.time[real].max() - self._first + 2) if real.any() else 2
+        self._rows = np.arange(shape[0] * shape[1]).reshape(shape[:2])
+        offsets = np.where(real, self.time - self._first, self._span - 1)
+        self._keys = (self._rows[..., None] * self._span + offsets).ravel()
+
+    def _query(self, right, strike, timestamps):
+        # Flattened key of each (contract, timestamp), clipped into the contract's key range
+        query_time = _seconds(timestamps) - self._first
+        row = self._rows[right, strike]
+        return row, query_time, row * self._span + np.clip(query_time, 0, self._span - 2)
+
+    def locate(self, strike_prices, option_types, timestamps):
+        """
+        Array indices (right, strike, column) for each lookup plus a mask of
+        the ones found. A contract with several candles at the timestamp
+        resolves to the last, as the DataFrame evaluators do.
+        """
+        strike_prices = np.asarray(strike_prices)
+        right = np.where(np.asarray(option_types) == RIGHTS[0], 0, 1)
+        if not len(self.strikes) or not self.time.shape[-1]:
+            empty = np.zeros(len(strike_prices), dtype=int)
+            return right, empty, empty, empty.astype(bool)
+
+        strike = np.minimum(np.searchsorted(self.strikes, strike_prices), len(self.strikes) - 1)
+        row, query_time, query = self._query(right, strike, timestamps)
+        position = np.maximum(np.searchsorted(self._keys, query, side='right') - 1, 0)
+        found = (
+            (self.strikes[strike] == strike_prices) &
+            (query_time >= 0) & (query_time <= self._span - 2) &
+            (self._keys[position] == query)
+        )
+        return right, strike, position - row * self.time.shape[-1], found
+
+    def candles_until(self, right, strike, timestamps):
+        """Number of candles of each (right, strike) contract at or before the timestamp."""
+        if not len(self.strikes) or not self.time.shape[-1]:
+            return np.zeros(len(right), dtype=int)
+        row, query_time, query = self._query(right, strike, timestamps)
+        count = np.searchsorted(self._keys, query, side='right') - row * self.time.shape[-1]
+        return np.where(query_time < 0, 0, count)
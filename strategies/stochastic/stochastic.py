@@ -1,50 +1,86 @@
 ﻿import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import os
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from rich.table import Table
 from rich.console import Console
-import smtplib
-from email.mime.text import MIMEText
-from ta.momentum import StochasticOscillator
-from api.breeze.breeze import BreezeAPI
+from api.alerts import send_alert
+from api.metrics import metrics
+from api.breeze.rate_limiter import historical_rate_limiter
+from strategies.stochastic import indicators
+from strategies.stochastic.option_chain import OptionChain, RIGHTS, ladder_strikes
+from strategies.stochastic.option_cache import option_history_cache
+from strategies.stochastic.trade_log import TradeLog
 from strategies.stochastic.historic_data import fetch_banknifty_futures_history, fetch_banknifty_options_history
 
 log = logging.getLogger(__name__)
 console = Console()
 
-# Global variable to store crossover data
-crossover_df = pd.DataFrame(columns=[
-    'Timestamp', 'Futures Price', 'VWAP', 'Option Type', 'Strike Price',
-    'Expiry', 'Option OHLC', '%K', '%D', 'Open', 'Close'
-])
+# Rows shown per page of the trade table
+PAGE_SIZE = 50
+# Strikes either side of the futures range loaded into the option chain, for both rights
+OPTION_LADDER = int(os.getenv('OPTION_LADDER', 2))
 
-def print_valid_trades():
-    if crossover_df.empty:
+@metrics.timed("print_valid_trades")
+def print_valid_trades(trade_log, page=None, page_size=PAGE_SIZE):
+    """Table of one page of trades (the latest page by default) followed by a per option type summary."""
+    if trade_log is None or not len(trade_log):
         console.print("[bold red]No valid trades found.[/bold red]")
         return
 
-    table = Table(title="Valid Trades")
+    total = len(trade_log)
+    pages = -(-total // page_size)
+    page = pages if page is None else min(max(page, 1), pages)
+    if isinstance(trade_log, TradeLog):
+        # Only the segments behind the page are read, the summary comes from running aggregates
+        shown = trade_log.rows((page - 1) * page_size, page * page_size)
+    else:
+        shown = trade_log.iloc[(page - 1) * page_size:page * page_size]
 
     columns_to_display = [
         'Timestamp', 'Futures Price', 'VWAP', 'Option Type', 'Strike Price',
         'Expiry', 'Option OHLC', '%K', '%D'
     ]
-
+    table = Table(title=f"Valid Trades (page {page} of {pages}, {total} trades)")
     for column in columns_to_display:
         table.add_column(column, style="cyan")
 
-    for _, row in crossover_df.iterrows():
-        row_color = "red" if row['Close'] > row['Open'] else "green"
-        table.add_row(
-            *[str(row[col]) for col in columns_to_display],
-            style=row_color
-        )
+    # Green when the option candle closed above its open, red below, default otherwise
+    option_open = pd.to_numeric(shown['Open'], errors='coerce').to_numpy(dtype=float)
+    option_close = pd.to_numeric(shown['Close'], errors='coerce').to_numpy(dtype=float)
+    row_colors = np.select([option_close > option_open, option_close < option_open], ["green", "red"], "")
+    cells = shown[columns_to_display].astype(str).to_numpy().tolist()
+    for row, row_color in zip(cells, row_colors.tolist()):
+        table.add_row(*row, style=row_color or None)
 
     console.print(table)
+    print_trade_summary(trade_log)
+
+def print_trade_summary(trades):
+    if not isinstance(trades, TradeLog):
+        trades = TradeLog.from_frame(trades)
+    summary = trades.summary()
+    table = Table(title="Trade Summary")
+    for column in ['Option Type', 'Trades', 'First', 'Last', 'Mean %K', 'Mean %D']:
+        table.add_column(column, style="cyan")
+    for option_type, row in zip(summary.index, summary.itertuples(index=False)):
+        table.add_row(option_type, str(row.Trades), str(row.First), str(row.Last), f"{row.Mean_K:.2f}", f"{row.Mean_D:.2f}")
+    console.print(table)
 
+@metrics.timed("calculate_vwap")
 def calculate_vwap(df):
-    df['VWAP'] = (df['volume'] * df['close']).cumsum() / df['volume'].cumsum()
+    df['VWAP'] = indicators.vwap(df['close'].to_numpy(dtype=float), df['volume'].to_numpy(dtype=float))
+    return df
+
+@metrics.timed("calculate_vwap")
+def calculate_session_vwap(df):
+    # Same as calculate_vwap but the running sums restart at every trading day
+    session = pd.to_datetime(df['datetime']).dt.date.to_numpy()
+    df['VWAP'] = indicators.vwap(df['close'].to_numpy(dtype=float), df['volume'].to_numpy(dtype=float), sessions=session)
     return df
 
 def calculate_stochastic_inbuilt(df, k_period=5, d_period=3):
@@ -56,16 +92,20 @@ def calculate_stochastic_inbuilt(df, k_period=5, d_period=3):
 
     return df
 
+@metrics.timed("calculate_stochastic")
 def calculate_stochastic(df, k_period=5, d_period=3):
-    stoch = StochasticOscillator(df['high'], df['low'], df['close'], k_period, d_period)
-    df['%K'] = stoch.stoch()
-    df['%D'] = stoch.stoch_signal()
+    # Same values as ta.momentum.StochasticOscillator, computed with the NumPy kernels
+    df['%K'], df['%D'] = indicators.stochastic(
+        df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float), df['close'].to_numpy(dtype=float),
+        k_period, d_period
+    )
     return df
 
-def check_vwap_condition(df):
-    above_vwap = (df['close'] > df['VWAP']).rolling(window=6).sum() == 6
-    below_vwap = (df['close'] < df['VWAP']).rolling(window=6).sum() == 6
-    return above_vwap, below_vwap
+def check_vwap_condition(df, window=6):
+    above_vwap, below_vwap = indicators.vwap_runs(
+        df['close'].to_numpy(dtype=float), df['VWAP'].to_numpy(dtype=float), window
+    )
+    return pd.Series(above_vwap, index=df.index), pd.Series(below_vwap, index=df.index)
 
 def get_nearest_option(current_price, option_type, step=100):
     rounded_price = round(current_price / step) * step
@@ -75,57 +115,98 @@ def get_nearest_option(current_price, option_type, step=100):
         return rounded_price if rounded_price > current_price else rounded_price + step
 
 def send_email_alert(subject, body):
-    sender_email = "your_email@example.com"
-    receiver_email = "receiver_email@example.com"
-    password = "your_email_password"
-
-    msg = MIMEText(body)
-    msg['Subject'] = subject
-    msg['From'] = sender_email
-    msg['To'] = receiver_email
-
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(sender_email, password)
-        server.send_message(msg)
-
-def run_strategy():
-    global crossover_df
-    breeze = BreezeAPI()
-    breeze.connect()
-
-    # Store the options history fetched here
-    historic_options_data = {}
-
-    # Fetch Bank Nifty futures data
-    futures_df = fetch_banknifty_futures_history()
-    if futures_df is None:
-        return
-
-    # Calculate VWAP
-    futures_df = calculate_vwap(futures_df)
-
-    # Check VWAP conditions
-    above_vwap, below_vwap = check_vwap_condition(futures_df)
-
-    # List to collect new rows
+    # Queued for the background dispatcher, the strategy doesn't wait on SMTP
+    send_alert(subject, body)
+
+def get_nearest_options(prices, option_types, step=100):
+    # Array form of get_nearest_option, same rounding (half to even) as round()
+    prices = np.asarray(prices, dtype=float)
+    rounded_prices = np.round(prices / step) * step
+    strikes = np.where(
+        np.asarray(option_types) == 'Call',
+        np.where(rounded_prices < prices, rounded_prices, rounded_prices - step),
+        np.where(rounded_prices > prices, rounded_prices, rounded_prices + step)
+    )
+    return strikes.astype(int)
+
+def is_entry(close, vwap, k, d, k_threshold=70):
+    # The option closed above its VWAP with %K above %D and below k_threshold, for single values or arrays
+    return (close > vwap) & (k > d) & (k < k_threshold)
+
+def next_flag(flag_stochastic_fulfilled, entered, k, d):
+    # If %K goes below the %D, then we wait for the new trade
+    if entered:
+        return True
+    if k < d:
+        return False
+    return flag_stochastic_fulfilled
+
+def trade_row(option_candle, current_price, option_type, strike_price, vwap, k, d):
+    # One trade entered on option_candle, a dict of the option's candle fields
+    return {
+        'Timestamp': option_candle['datetime'],
+        'Futures Price': current_price,
+        'VWAP': round(vwap, 2),
+        'Option Type': option_type,
+        'Strike Price': strike_price,
+        'Expiry': option_candle.get('expiry_date'),
+        'Option OHLC': f"O:{option_candle['open']} H:{option_candle['high']} L:{option_candle['low']} C:{option_candle['close']}",
+        '%K': round(k, 2),
+        '%D': round(d, 2),
+        'Open': option_candle['open'],
+        'Close': option_candle['close'],
+    }
+
+def _build_trade_rows(df):
+    # df holds one evaluated option candle per row, aligned with its futures bar
+    return pd.DataFrame({
+        'Timestamp': df['datetime'].to_numpy(),
+        'Futures Price': df['Futures Price'].to_numpy(),
+        'VWAP': df['VWAP'].round(2).to_numpy(),
+        'Option Type': df['Option Type'].to_numpy(),
+        'Strike Price': df['Strike Price'].to_numpy(),
+        'Expiry': df['expiry_date'].to_numpy(),
+        'Option OHLC': (
+            "O:" + df['open'].astype(str) + " H:" + df['high'].astype(str) +
+            " L:" + df['low'].astype(str) + " C:" + df['close'].astype(str)
+        ).to_numpy(),
+        '%K': df['%K'].round(2).to_numpy(),
+        '%D': df['%D'].round(2).to_numpy(),
+        'Open': df['open'].to_numpy(),
+        'Close': df['close'].to_numpy(),
+    })
+
+def _select_trades(evaluated, flag_stochastic_fulfilled):
+    # Entries among the evaluated option candles (in bar order), and the flag after the last of them
+    k = evaluated['%K'].to_numpy()
+    d = evaluated['%D'].to_numpy()
+    trade_mask = is_entry(evaluated['close'].to_numpy(), evaluated['VWAP'].to_numpy(), k, d)
+
+    # A trade sets the flag, %K dropping below %D clears it, anything else carries it forward
+    flag_events = pd.Series(np.where(trade_mask, 1.0, np.where(k < d, 0.0, np.nan)))
+    flags = flag_events.ffill().fillna(float(flag_stochastic_fulfilled))
+    return _build_trade_rows(evaluated[trade_mask]), bool(flags.iloc[-1])
+
+def evaluate_signals(futures_df, above_vwap, below_vwap, historic_options_data, flag_stochastic_fulfilled=False,
+                     step=100, fetch_options_history=fetch_banknifty_options_history):
     new_rows = []
 
-    flag_stochastic_fulfilled = False
-
     for i in range(len(futures_df)):
         if above_vwap.iloc[i] or below_vwap.iloc[i]:
             current_price = futures_df['close'].iloc[i]
             option_type = 'Call' if above_vwap.iloc[i] else 'Put'
-            strike_price = get_nearest_option(current_price, option_type)
+            strike_price = get_nearest_option(current_price, option_type, step)
             current_datetime_str = futures_df['datetime'].iloc[i]
             option_history_key = f"{str(strike_price)}-{option_type}"
             log.info(f"Checking at {current_datetime_str=} and {current_price=}")
 
             # Fetch option data
             if option_history_key in historic_options_data:
+                metrics.inc("option_history_lookups", result="hit")
                 option_df = historic_options_data[option_history_key]
             else:
-                option_df = fetch_banknifty_options_history(strike_price, option_type)
+                metrics.inc("option_history_lookups", result="miss")
+                option_df = fetch_options_history(strike_price, option_type)
                 historic_options_data[option_history_key] = option_df
 
             if option_df is None:
@@ -141,39 +222,213 @@ def run_strategy():
             if option_df.empty:
                 continue
 
-            # Check for trade conditions
-            if \
-                (option_df['close'].iloc[-1] > option_df['VWAP'].iloc[-1] and
-                option_df['%K'].iloc[-1] > option_df['%D'].iloc[-1] and
-                option_df['%K'].iloc[-1] < 70):
-
-                # Append to new_rows list
-                new_rows.append({
-                    'Timestamp': option_df['datetime'].iloc[-1],
-                    'Futures Price': current_price,
-                    'VWAP': round(option_df['VWAP'].iloc[-1], 2),
-                    'Option Type': option_type,
-                    'Strike Price': strike_price,
-                    'Expiry': option_df['expiry_date'].iloc[-1],
-                    'Option OHLC': f"O:{option_df['open'].iloc[-1]} H:{option_df['high'].iloc[-1]} L:{option_df['low'].iloc[-1]} C:{option_df['close'].iloc[-1]}",
-                    '%K': round(option_df['%K'].iloc[-1], 2),
-                    '%D': round(option_df['%D'].iloc[-1], 2),
-                })
-
-                flag_stochastic_fulfilled = True
-
-            # If %K goes below the %D, then we wait for the new trade
-            elif flag_stochastic_fulfilled and \
-                option_df['%K'].iloc[-1] < option_df['%D'].iloc[-1]:
-                flag_stochastic_fulfilled = False
-
-    # Add new rows to crossover_df only if there are any
-    if new_rows:
-        new_df = pd.DataFrame(new_rows)
-        crossover_df = pd.concat([crossover_df, new_df], ignore_index=True)
+            # Check for trade conditions on the last candle at this timestamp
+            option_candle = option_df.iloc[[-1]].to_dict('records')[0]
+            k, d = option_candle['%K'], option_candle['%D']
+            entered = is_entry(option_candle['close'], option_candle['VWAP'], k, d)
+            if entered:
+                new_rows.append(trade_row(option_candle, current_price, option_type, strike_price, option_candle['VWAP'], k, d))
+            flag_stochastic_fulfilled = next_flag(flag_stochastic_fulfilled, entered, k, d)
+
+    return pd.DataFrame(new_rows), flag_stochastic_fulfilled
+
+def evaluate_signals_vectorized(futures_df, above_vwap, below_vwap, historic_options_data, flag_stochastic_fulfilled=False,
+                                vwap=calculate_vwap, step=100, fetch_options_history=fetch_banknifty_options_history):
+    signal_mask = (above_vwap | below_vwap).to_numpy(dtype=bool)
+    if not signal_mask.any():
+        return pd.DataFrame(), flag_stochastic_fulfilled
+
+    # One row per futures bar that passed the VWAP check
+    signal_bars = pd.DataFrame({
+        'bar': np.flatnonzero(signal_mask),
+        'datetime': futures_df['datetime'].array[signal_mask],
+        'Futures Price': futures_df['close'].to_numpy()[signal_mask],
+        'Option Type': np.where(above_vwap.to_numpy(dtype=bool)[signal_mask], 'Call', 'Put'),
+    })
+    signal_bars['Strike Price'] = get_nearest_options(signal_bars['Futures Price'], signal_bars['Option Type'], step)
+    signal_bars['key'] = signal_bars['Strike Price'].astype(str) + "-" + signal_bars['Option Type']
+
+    # Indicators are computed once per strike/type and joined to the bars by timestamp
+    joined = []
+    for option_history_key, key_bars in signal_bars.groupby('key', sort=False):
+        if option_history_key in historic_options_data:
+            metrics.inc("option_history_lookups", result="hit")
+            option_df = historic_options_data[option_history_key]
+        else:
+            metrics.inc("option_history_lookups", result="miss")
+            strike_price, option_type = option_history_key.split("-")
+            option_df = fetch_options_history(int(strike_price), option_type)
+            historic_options_data[option_history_key] = option_df
+
+        if option_df is None:
+            continue
+
+        option_df = vwap(option_df)
+        option_df = calculate_stochastic(option_df)
+
+        # The per-bar path uses the last candle for a timestamp, so keep that one
+        option_df = option_df.drop_duplicates(subset='datetime', keep='last')
+        joined.append(key_bars.drop(columns='key').merge(
+            option_df[['datetime', 'open', 'high', 'low', 'close', 'expiry_date', 'VWAP', '%K', '%D']],
+            on='datetime', how='inner'
+        ))
+
+    if not joined:
+        return pd.DataFrame(), flag_stochastic_fulfilled
+
+    evaluated = pd.concat(joined, ignore_index=True).sort_values('bar', kind='stable')
+    if evaluated.empty:
+        return pd.DataFrame(), flag_stochastic_fulfilled
+
+    return _select_trades(evaluated, flag_stochastic_fulfilled)
+
+def evaluate_signals_chain(futures_df, above_vwap, below_vwap, option_chain, flag_stochastic_fulfilled=False, step=100):
+    # Same signals as evaluate_signals_vectorized, read out of an OptionChain by array index
+    signal_mask = (above_vwap | below_vwap).to_numpy(dtype=bool)
+    if not signal_mask.any():
+        return pd.DataFrame(), flag_stochastic_fulfilled
+
+    futures_price = futures_df['close'].to_numpy()[signal_mask]
+    option_types = np.where(above_vwap.to_numpy(dtype=bool)[signal_mask], 'Call', 'Put')
+    strikes = get_nearest_options(futures_price, option_types, step)
+    timestamps = futures_df['datetime'].array[signal_mask]
+    right, strike, column, found = option_chain.locate(strikes, option_types, timestamps)
+    if not found.any():
+        return pd.DataFrame(), flag_stochastic_fulfilled
+
+    right, strike, column = right[found], strike[found], column[found]
+    evaluated = pd.DataFrame({
+        'datetime': timestamps[found],
+        'Futures Price': futures_price[found],
+        'Option Type': option_types[found],
+        'Strike Price': strikes[found],
+        'open': option_chain.open[right, strike, column],
+        'high': option_chain.high[right, strike, column],
+        'low': option_chain.low[right, strike, column],
+        'close': option_chain.close[right, strike, column],
+        'expiry_date': option_chain.expiry[right, strike],
+        'VWAP': option_chain.vwap[right, strike, column],
+        '%K': option_chain.k[right, strike, column],
+        '%D': option_chain.d[right, strike, column],
+    })
+
+    return _select_trades(evaluated, flag_stochastic_fulfilled)
+
+def plan_option_fetches(futures_df, above_vwap, below_vwap, step=100):
+    # Every (strike, type) the evaluation will touch, in order of first use
+    signal_mask = (above_vwap | below_vwap).to_numpy(dtype=bool)
+    option_types = np.where(above_vwap.to_numpy(dtype=bool)[signal_mask], 'Call', 'Put')
+    strikes = get_nearest_options(futures_df['close'].to_numpy()[signal_mask], option_types, step)
+    return list(dict.fromkeys(zip(strikes.tolist(), option_types.tolist())))
+
+def prefetch_options_history(planned_options, historic_options_data, max_workers=8, fetch_options_history=fetch_banknifty_options_history):
+    pending = [
+        (strike_price, option_type) for strike_price, option_type in planned_options
+        if f"{strike_price}-{option_type}" not in historic_options_data
+    ]
+    metrics.inc("option_history_prefetch", len(planned_options) - len(pending), result="hit")
+    metrics.inc("option_history_prefetch", len(pending), result="miss")
+    if not pending:
+        return historic_options_data
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        option_dfs = executor.map(lambda option: fetch_options_history(*option), pending)
+        for (strike_price, option_type), option_df in zip(pending, option_dfs):
+            historic_options_data[f"{strike_price}-{option_type}"] = option_df
+
+    return historic_options_data
+
+def run_strategy(vectorized=True, max_workers=8, trade_log=None, step=100,
+                 fetch_futures_history=fetch_banknifty_futures_history,
+                 fetch_options_history=fetch_banknifty_options_history, show_trades=True, ladder=OPTION_LADDER, option_cache=None):
+    """
+    One pass of the strategy over recent history, Bank Nifty unless other
+    fetchers and strike step are given. Trades go to trade_log (a new
+    TradeLog by default), which is returned; whoever runs the last cycle
+    closes it.
+
+    Vectorized runs load the options into an OptionChain holding both
+    rights of every strike within ladder steps (OPTION_LADDER) of the
+    futures range, not only the strikes the signals pick. ladder=0 loads
+    just those.
+
+    Option history is kept in option_cache (an OptionHistoryCache, the
+    process wide option_history_cache by default), so calls within the
+    same candle reuse it and memory stays within the cache's budget.
+    """
+    if trade_log is None:
+        trade_log = TradeLog()
+
+    # Store the options history fetched here, bounded and shared between calls
+    historic_options_data = option_history_cache if option_cache is None else option_cache
+
+    fetch_started = time.perf_counter()
+
+    # Fetch futures data
+    with metrics.timer("stage_seconds", stage="fetch"):
+        futures_df = fetch_futures_history()
+    if futures_df is None:
+        return trade_log
+
+    # Calculate VWAP
+    futures_df = calculate_vwap(futures_df)
+
+    # Check VWAP conditions
+    above_vwap, below_vwap = check_vwap_condition(futures_df)
+
+    # Fetch the history of every option the signal bars need before evaluating
+    planned_options = plan_option_fetches(futures_df, above_vwap, below_vwap, step)
+    if vectorized and ladder:
+        planned_options = list(dict.fromkeys(planned_options + [
+            (strike_price, option_type)
+            for strike_price in ladder_strikes(futures_df['close'].to_numpy(), step, ladder).tolist()
+            for option_type in RIGHTS
+        ]))
+    planned_keys = [f"{strike_price}-{option_type}" for strike_price, option_type in planned_options]
+    # A bounded cache must not evict frames this cycle fetched before it evaluates them
+    pinned = historic_options_data.pinned(planned_keys) if hasattr(historic_options_data, 'pinned') else nullcontext()
+    with pinned:
+        with metrics.timer("stage_seconds", stage="fetch"):
+            prefetch_options_history(planned_options, historic_options_data, max_workers, fetch_options_history)
+        fetch_seconds = time.perf_counter() - fetch_started
+
+        # Evaluate option conditions on every bar that passed the VWAP check
+        compute_started = time.perf_counter()
+        if vectorized:
+            # Every option the signals need was prefetched, indicators run across all of them at once
+            # Iterating doesn't count as a lookup, unlike `in`
+            cached = set(historic_options_data)
+            missing = [key for key in planned_keys if key not in cached]
+            if missing:
+                log.warning(f"Option history for {missing} is no longer cached, those strikes are skipped")
+            option_chain = OptionChain({key: historic_options_data.get(key) for key in planned_keys})
+            new_df, flag_stochastic_fulfilled = evaluate_signals_chain(
+                futures_df, above_vwap, below_vwap, option_chain, step=step
+            )
+        else:
+            new_df, flag_stochastic_fulfilled = evaluate_signals(
+                futures_df, above_vwap, below_vwap, historic_options_data,
+                step=step, fetch_options_history=fetch_options_history
+            )
+        compute_seconds = time.perf_counter() - compute_started
+    metrics.observe("stage_seconds", compute_seconds, stage="evaluate_signals")
+
+    log.info(
+        f"Fetched {len(planned_options)} option histories in {fetch_seconds:.2f}s, "
+        f"evaluated signals in {compute_seconds:.2f}s"
+    )
+    log.info(f"Breeze historical calls so far: {historical_rate_limiter.stats.snapshot()}")
+    if hasattr(historic_options_data, 'stats'):
+        log.debug(f"Option history cache: {historic_options_data.stats()}")
+
+    # Segments are written as the log fills up and when its owner closes it, not every cycle
+    trade_log.extend(new_df)
 
     # Print valid trades at the end
-    print_valid_trades()
+    if show_trades:
+        print_valid_trades(trade_log)
+    metrics.export()
+    return trade_log
 
 # if __name__ == "__main__":
 #     run_strategy()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import math
+import itertools
+from collections import deque
+
+# Incremental versions of calculate_vwap, calculate_stochastic and
+# check_vwap_condition. Every update takes one candle, runs in constant time
+# and returns the same values the batch functions give for that candle.
+
+NAN = float('nan')
+
+class StreamingVWAP:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.cum_price_volume = 0.0
+        self.cum_volume = 0
+
+    def update(self, close, volume):
+        price_volume = volume * close
+        self.cum_volume += volume
+        # cumsum skips missing values but the row itself stays NaN
+        if price_volume != price_volume:
+            return NAN
+        self.cum_price_volume += price_volume
+        if self.cum_volume == 0:
+            return NAN
+        return self.cum_price_volume / self.cum_volume
+
+    def remove(self, close, volume):
+        # Take a candle fed earlier back out of the running sums
+        price_volume = volume * close
+        self.cum_volume -= volume
+        if price_volume == price_volume:
+            self.cum_price_volume -= price_volume
+
+class RollingExtreme:
+    """Rolling min or max over the last window values using a monotonic deque."""
+
+    def __init__(self, window, is_max=False):
+        self.window = window
+        self.is_max = is_max
+        self.index = -1
+        self.candidates = deque()
+        self.valid = deque()
+        self.valid_count = 0
+
+    def update(self, value):
+        self.index += 1
+
+        # NaN values take a slot in the window but never become the extreme
+        is_valid = value == value
+        self.valid.append(is_valid)
+        self.valid_count += is_valid
+        if len(self.valid) > self.window:
+            self.valid_count -= self.valid.popleft()
+
+        if is_valid:
+            while self.candidates and (
+                self.candidates[-1][1] <= value if self.is_max else self.candidates[-1][1] >= value
+            ):
+                self.candidates.pop()
+            self.candidates.append((self.index, value))
+
+        while self.candidates and self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+
+        if self.valid_count < self.window:
+            return NAN
+        return self.candidates[0][1]
+
+class RollingMean:
+    """
+    Rolling mean with min_periods equal to the window. Adds the window
+    oldest value first and returns the value itself for a window of
+    identical values, exactly like indicators.rolling_mean.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, value):
+        self.values.append(value)
+        if len(self.values) < self.window:
+            return NAN
+
+        total = self.values[0]
+        all_same = True
+        for previous in itertools.islice(self.values, 1, None):
+            total += previous
+            all_same = all_same and previous == self.values[0]
+        if all_same:
+            return value
+        return total / self.window
+
+class StreamingStochastic:
+    def __init__(self, k_period=5, d_period=3):
+        self.low_min = RollingExtreme(k_period)
+        self.high_max = RollingExtreme(k_period, is_max=True)
+        self.d_mean = RollingMean(d_period)
+
+    def update(self, high, low, close):
+        low_min = self.low_min.update(low)
+        high_max = self.high_max.update(high)
+
+        numerator = 100 * (close - low_min)
+        denominator = high_max - low_min
+        if denominator == 0:
+            k = NAN if numerator == 0 or numerator != numerator else math.copysign(math.inf, numerator)
+        else:
+            k = numerator / denominator
+
+        return k, self.d_mean.update(k)
+
+class VWAPRunCounter:
+    """Counts consecutive closes above/below VWAP, the streaming form of check_vwap_condition."""
+
+    def __init__(self, window=6):
+        self.window = window
+        self.above = 0
+        self.below = 0
+
+    def update(self, close, vwap):
+        self.above = self.above + 1 if close > vwap else 0
+        self.below = self.below + 1 if close < vwap else 0
+        return self.above >= self.window, self.below >= self.window
+
+    def recount(self, closes, vwaps):
+        # Count again over the latest closes, after the VWAPs they compare against changed
+        self.above = self.below = 0
+        for close, vwap in zip(closes[-self.window:], vwaps[-self.window:]):
+            self.update(close, vwap)
+
+class StreamingIndicators:
+    """VWAP, stochastic and the VWAP run condition for one instrument, one candle at a time."""
+
+    def __init__(self, k_period=5, d_period=3, vwap_window=6):
+        self.vwap = StreamingVWAP()
+        self.stochastic = StreamingStochastic(k_period, d_period)
+        self.vwap_run = VWAPRunCounter(vwap_window)
+
+    def update(self, candle):
+        high, low, close = float(candle['high']), float(candle['low']), float(candle['close'])
+        vwap = self.vwap.update(close, int(candle['volume']))
+        k, d = self.stochastic.update(high, low, close)
+        above_vwap, below_vwap = self.vwap_run.update(close, vwap)
+        return {
+            'VWAP': vwap,
+            '%K': k,
+            '%D': d,
+            'above_vwap': above_vwap,
+            'below_vwap': below_vwap,
+        }
+
+    def rebase(self, dropped, recent):
+        """
+        Move the start of the VWAP past the dropped candles, as if feeding
+        had begun after them. Both are (close, volume) pairs; recent are the
+        latest candles fed, whose VWAP run is counted again. The stochastic
+        only looks k_period + d_period candles back and is left alone.
+        """
+        for close, volume in dropped:
+            self.vwap.remove(float(close), int(volume))
+
+        # VWAP at each recent candle under the new start, walking back from the latest
+        cum_price_volume, cum_volume = self.vwap.cum_price_volume, self.vwap.cum_volume
+        closes, vwaps = [], []
+        for close, volume in reversed(recent):
+            close, volume = float(close), int(volume)
+            price_volume = volume * close
+            closes.append(close)
+            vwaps.append(NAN if price_volume != price_volume or cum_volume == 0 else cum_price_volume / cum_volume)
+            cum_volume -= volume
+            if price_volume == price_volume:
+                cum_price_volume -= price_volume
+        self.vwap_run.recount(closes[::-1], vwaps[::-1])
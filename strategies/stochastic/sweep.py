@@ -0,0 +1,250 @@
+import os
+import time
+import random
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from rich.table import Table
+from rich.console import Console
+from strategies.stochastic.historic_data import fetch_banknifty_futures_history, fetch_banknifty_options_history
+from strategies.stochastic.stochastic import (
+    calculate_vwap, calculate_stochastic, check_vwap_condition, get_nearest_options, is_entry
+)
+
+log = logging.getLogger(__name__)
+console = Console()
+
+# Values used by run_strategy today
+DEFAULT_PARAMETERS = {
+    'k_period': 5,
+    'd_period': 3,
+    'vwap_window': 6,
+    'k_threshold': 70,
+    'step': 100,
+}
+# A trade is scored by the option close this many bars after entry
+FORWARD_BARS = 6
+# Swept by the command line when no --grid is given
+DEFAULT_GRID = {
+    'k_period': [5, 9, 14],
+    'd_period': [3, 5],
+    'vwap_window': [4, 6, 8],
+    'k_threshold': [60, 70, 80],
+}
+TRADE_COLUMNS = ['Timestamp', 'Option Type', 'Strike Price', 'Forward Return']
+
+def parameter_grid(grid):
+    """Every combination of the values in grid, e.g. {'k_period': [5, 9], 'step': [100]}."""
+    names = list(grid)
+    return [dict(DEFAULT_PARAMETERS, **dict(zip(names, values))) for values in itertools.product(*grid.values())]
+
+def parse_grid(specs):
+    """{'k_period': [5, 9]} out of command line specs like "k_period=5,9"."""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_PARAMETERS or not values:
+            raise ValueError(f"Expected NAME=VALUE[,VALUE...] with NAME one of {', '.join(DEFAULT_PARAMETERS)}, got {spec!r}")
+        grid[name] = [int(value) for value in values.split(",")]
+    return grid
+
+def random_parameters(space, samples, seed=None):
+    """samples random combinations drawn from the value lists in space."""
+    rng = random.Random(seed)
+    combinations = {tuple(rng.choice(values) for values in space.values()) for _ in range(samples * 4)}
+    return [dict(DEFAULT_PARAMETERS, **dict(zip(space, values))) for values in list(combinations)[:samples]]
+
+class SweepData:
+    """
+    Candle data plus everything that doesn't depend on the swept parameters:
+    the futures and option VWAPs, the above/below VWAP masks for each window
+    and, for every option, the row matching each futures bar. Stochastic
+    columns are computed once per (option, k_period, d_period) and reused.
+    """
+
+    def __init__(self, futures_df, historic_options_data, vwap_windows, forward_bars=FORWARD_BARS):
+        futures_df = calculate_vwap(futures_df.copy())
+        self.futures_datetime = futures_df['datetime'].to_numpy()
+        self.futures_close = futures_df['close'].to_numpy(dtype=float)
+        self.masks = {}
+        for window in vwap_windows:
+            above_vwap, below_vwap = check_vwap_condition(futures_df, window=window)
+            self.masks[window] = (above_vwap.to_numpy(dtype=bool), below_vwap.to_numpy(dtype=bool))
+
+        futures_datetime = pd.Index(futures_df['datetime'])
+        self.options = {}
+        for key, option_df in historic_options_data.items():
+            if option_df is None or option_df.empty:
+                continue
+            option_df = calculate_vwap(option_df.copy())
+            close = option_df['close'].to_numpy(dtype=float)
+
+            # Last option row for each futures timestamp, -1 when the option has no candle then
+            last_rows = pd.Series(np.arange(len(option_df)), index=option_df['datetime']).groupby(level=0).last()
+            rows = last_rows.reindex(futures_datetime).fillna(-1).to_numpy(dtype=int)
+
+            forward = np.minimum(np.arange(len(close)) + forward_bars, len(close) - 1)
+            self.options[key] = {
+                'df': option_df[['high', 'low', 'close']],
+                'rows': rows,
+                'close': close,
+                'VWAP': option_df['VWAP'].to_numpy(dtype=float),
+                'forward_return': (close[forward] - close) / close,
+            }
+        self._stochastic = {}
+
+    def stochastic(self, key, k_period, d_period):
+        cache_key = (key, k_period, d_period)
+        if cache_key not in self._stochastic:
+            option_df = calculate_stochastic(self.options[key]['df'].copy(), k_period, d_period)
+            self._stochastic[cache_key] = (option_df['%K'].to_numpy(dtype=float), option_df['%D'].to_numpy(dtype=float))
+        return self._stochastic[cache_key]
+
+    def _trades(self, parameters):
+        # (bars, strike price, option type, forward returns) of the trades taken on each option
+        above_vwap, below_vwap = self.masks[parameters['vwap_window']]
+        bars = np.flatnonzero(above_vwap | below_vwap)
+        option_types = np.where(above_vwap[bars], 'Call', 'Put')
+        strikes = get_nearest_options(self.futures_close[bars], option_types, parameters['step'])
+
+        for strike_price, option_type in set(zip(strikes.tolist(), option_types.tolist())):
+            option = self.options.get(f"{strike_price}-{option_type}")
+            if option is None:
+                continue
+            option_bars = bars[(strikes == strike_price) & (option_types == option_type)]
+            rows = option['rows'][option_bars]
+            option_bars, rows = option_bars[rows >= 0], rows[rows >= 0]
+            k, d = self.stochastic(f"{strike_price}-{option_type}", parameters['k_period'], parameters['d_period'])
+            trade_mask = is_entry(option['close'][rows], option['VWAP'][rows], k[rows], d[rows], parameters['k_threshold'])
+            yield option_bars[trade_mask], strike_price, option_type, option['forward_return'][rows[trade_mask]]
+
+    def trades(self, parameters):
+        """The trades one combination takes, in bar order, with the forward return each is scored by."""
+        frames = [
+            pd.DataFrame({
+                'bar': bars,
+                'Timestamp': self.futures_datetime[bars],
+                'Option Type': option_type,
+                'Strike Price': strike_price,
+                'Forward Return': returns,
+            })
+            for bars, strike_price, option_type, returns in self._trades(parameters)
+        ]
+        if not frames:
+            return pd.DataFrame(columns=TRADE_COLUMNS)
+        return pd.concat(frames).sort_values('bar', ignore_index=True)[TRADE_COLUMNS]
+
+    def evaluate(self, parameters):
+        returns = [returns for _, _, _, returns in self._trades(parameters)]
+        returns = np.concatenate(returns) if returns else np.array([])
+        return dict(
+            parameters,
+            trades=len(returns),
+            hit_rate=float((returns > 0).mean()) if len(returns) else 0.0,
+            mean_return=float(returns.mean()) if len(returns) else 0.0,
+            total_return=float(returns.sum()),
+        )
+
+# Each worker process gets the shared data once through the pool initializer
+_worker_data = None
+
+def _init_worker(sweep_data):
+    global _worker_data
+    _worker_data = sweep_data
+
+def _evaluate_chunk(parameter_chunk):
+    return [_worker_data.evaluate(parameters) for parameters in parameter_chunk]
+
+def load_sweep_options(futures_df, combinations, max_workers=8):
+    """Fetch every option any combination can pick, so the sweep itself never hits the network."""
+    futures_df = calculate_vwap(futures_df.copy())
+    planned = {}
+    for window in {parameters['vwap_window'] for parameters in combinations}:
+        above_vwap, below_vwap = check_vwap_condition(futures_df, window=window)
+        signal_mask = (above_vwap | below_vwap).to_numpy(dtype=bool)
+        option_types = np.where(above_vwap.to_numpy(dtype=bool)[signal_mask], 'Call', 'Put')
+        for step in {parameters['step'] for parameters in combinations}:
+            strikes = get_nearest_options(futures_df['close'].to_numpy()[signal_mask], option_types, step)
+            planned.update(dict.fromkeys(zip(strikes.tolist(), option_types.tolist())))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        option_dfs = executor.map(lambda option: fetch_banknifty_options_history(*option), planned)
+        return {f"{strike_price}-{option_type}": option_df for (strike_price, option_type), option_df in zip(planned, option_dfs)}
+
+def run_sweep(combinations, futures_df=None, historic_options_data=None, processes=None, rank_by='total_return'):
+    """
+    Evaluate every parameter combination against the same candles and
+    return a table ranked by rank_by. Candles default to the ones
+    run_strategy uses.
+    """
+    started = time.perf_counter()
+    if futures_df is None:
+        futures_df = fetch_banknifty_futures_history()
+        if futures_df is None:
+            return pd.DataFrame()
+    if historic_options_data is None:
+        historic_options_data = load_sweep_options(futures_df, combinations)
+
+    sweep_data = SweepData(futures_df, historic_options_data, {parameters['vwap_window'] for parameters in combinations})
+    log.info(f"Prepared sweep data in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        results = [sweep_data.evaluate(parameters) for parameters in combinations]
+    else:
+        chunk_size = max(1, len(combinations) // (processes * 4))
+        chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(sweep_data,)) as executor:
+            results = [result for chunk in executor.map(_evaluate_chunk, chunks) for result in chunk]
+    log.info(f"Evaluated {len(combinations)} combinations in {time.perf_counter() - started:.2f}s")
+
+    return pd.DataFrame(results).sort_values(rank_by, ascending=False, ignore_index=True)
+
+def print_sweep_results(results, top=20):
+    table = Table(title=f"Top {min(top, len(results))} of {len(results)} combinations")
+    for column in results.columns:
+        table.add_column(column, style="cyan")
+    for row in results.head(top).itertuples(index=False):
+        table.add_row(*[f"{value:.4f}" if isinstance(value, float) else str(value) for value in row])
+    console.print(table)
+
+def run_sweep_cli(grid=None, samples=None, seed=None, processes=None, rank_by='total_return', top=20):
+    """
+    Sweep grid (DEFAULT_GRID by default), every combination or, with
+    samples, that many random ones, and print the best top combinations.
+    """
+    grid = grid or DEFAULT_GRID
+    if samples:
+        combinations = random_parameters(grid, samples, seed)
+    else:
+        combinations = parameter_grid(grid)
+    console.print(f"[bold green]Sweeping {len(combinations)} parameter combinations[/bold green]")
+    results = run_sweep(combinations, processes=processes, rank_by=rank_by)
+    if results.empty:
+        console.print("[bold red]No futures history to sweep over.[/bold red]")
+        return results
+    print_sweep_results(results, top)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sweep the stochastic strategy parameters over recent history")
+    parser.add_argument("--grid", nargs="+", metavar="NAME=V1,V2",
+                        help=f"Values to sweep, e.g. k_period=5,9 vwap_window=4,6 (one of {', '.join(DEFAULT_PARAMETERS)})")
+    parser.add_argument("--random", type=int, metavar="SAMPLES", help="Evaluate this many random combinations of the grid instead of all")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--rank-by", default="total_return", choices=["trades", "hit_rate", "mean_return", "total_return"])
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level="INFO", format="%(message)s")
+    try:
+        grid = parse_grid(args.grid or [])
+    except ValueError as e:
+        parser.error(str(e))
+    run_sweep_cli(grid, args.random, args.seed, args.processes, args.rank_by, args.top)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from strategies.stochastic.checkpoint import StrategyCheckpoint, StrategyState, run_checkpointed
+
+BARS = 600
+WINDOW = 300
+
+def _candles(seed, start_price, drift):
+    rng = np.random.default_rng(seed)
+    close = start_price + np.cumsum(rng.normal(drift, 20, BARS))
+    spread = rng.uniform(1, 15, BARS)
+    return pd.DataFrame({
+        'datetime': pd.date_range("2024-08-19 09:15", periods=BARS, freq="5min").strftime("%Y-%m-%d %H:%M:%S"),
+        'open': close + rng.normal(0, 5, BARS),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.integers(100, 5000, BARS),
+    })
+
+FUTURES = _candles(0, 51000, 0.5)
+OPTIONS = {}
+
+def _option_history(end):
+    # Like the REST fetch, a window of the same length ending at the latest bar
+    def fetch(strike_price, option_type):
+        key = f"{strike_price}-{option_type}"
+        if key not in OPTIONS:
+            OPTIONS[key] = _candles(int(strike_price) + (option_type == 'Call'), 300, 0)
+        return OPTIONS[key].iloc[max(end - WINDOW, 0):end].reset_index(drop=True)
+    return fetch
+
+def _cycle(end):
+    return FUTURES.iloc[max(end - WINDOW, 0):end].reset_index(drop=True), _option_history(end)
+
+def _assert_resumes_like_fresh_runs(ends):
+    state = StrategyState()
+    trades = 0
+    last_bar = ""
+    for end in ends:
+        futures_df, option_history = _cycle(end)
+        new_trades = state.process(futures_df, option_history)
+
+        fresh_trades = StrategyState().process(futures_df, option_history)
+        assert new_trades == [trade for trade in fresh_trades if trade['Timestamp'] > last_bar]
+        last_bar = futures_df['datetime'].iloc[-1]
+        trades += len(new_trades)
+    assert trades
+
+def test_resumed_run_matches_a_fresh_run_on_the_latest_window():
+    _assert_resumes_like_fresh_runs(range(WINDOW, BARS + 1, 23))
+
+def test_resume_bar_by_bar_keeps_the_indicators():
+    state = StrategyState()
+    state.process(*_cycle(WINDOW))
+    futures = state.futures
+    _assert_resumes_like_fresh_runs(range(WINDOW, WINDOW + 15))
+    # A one bar slide only undoes the candle that left, nothing is fed again
+    state.process(*_cycle(WINDOW + 1))
+    assert state.futures is futures
+    assert len(state.fed["futures"]) == WINDOW
+
+def test_resume_after_a_long_gap():
+    # Only a few fed candles are left in the window, they are fed again
+    _assert_resumes_like_fresh_runs([WINDOW, 2 * WINDOW - 10, BARS])
+
+def test_checkpoint_round_trip_resumes(tmp_path):
+    checkpoint = StrategyCheckpoint(str(tmp_path / "state.pkl"))
+    for end in (WINDOW, WINDOW + 40):
+        futures_df, option_history = _cycle(end)
+        state = run_checkpointed(
+            checkpoint, fetch_futures_history=lambda: futures_df,
+            fetch_options_history=option_history, show_trades=False
+        )
+    fresh = StrategyState()
+    fresh.process(*_cycle(WINDOW + 40))
+    assert checkpoint.load().last_bar == state.last_bar == fresh.last_bar
+    assert checkpoint.load().futures.vwap.cum_volume == fresh.futures.vwap.cum_volume
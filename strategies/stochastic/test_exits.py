@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from strategies.stochastic.exits import exit_stats, simulate_exits
+from strategies.stochastic.option_chain import OptionChain
+
+def _simulate(candles, start="2024-08-21 14:00", **exit_rules):
+    """One Call bought at the close of the first of candles, (open, high, low, close) every 5 minutes."""
+    times = pd.date_range(start, periods=len(candles), freq="5min", tz="Asia/Kolkata")
+    open_, high, low, close = zip(*candles)
+    option_df = pd.DataFrame({
+        'datetime': times, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': 100,
+    })
+    trades = pd.DataFrame({'Timestamp': [times[0]], 'Option Type': ['Call'], 'Strike Price': [51000]})
+    exit_rules = {'stop_loss': None, 'target': None, **exit_rules}
+    result = simulate_exits(trades, OptionChain({"51000-Call": option_df}), **exit_rules)
+    assert len(result) == 1
+    return result.iloc[0]
+
+ENTRY = (100, 100, 100, 100)
+
+def test_stop_loss():
+    exit = _simulate([ENTRY, (100, 108, 96, 104), (104, 112, 70, 80), (80, 90, 60, 62)], stop_loss=0.25)
+    assert exit['Exit Reason'] == "stop_loss"
+    assert exit['Exit Price'] == 75
+    assert exit['Bars Held'] == 2
+    assert exit['P&L'] == -25
+    assert exit['MAE'] == -25
+
+def test_stop_exit_candle_high_is_not_favourable_excursion():
+    # The stop candle trades up to 130 but the stop is taken to fill first, MFE only counts its open
+    exit = _simulate([ENTRY, (100, 108, 96, 104), (104, 130, 70, 80)], stop_loss=0.25)
+    assert exit['Exit Reason'] == "stop_loss"
+    assert exit['MFE'] == 8
+
+def test_stop_opening_through_the_level_fills_at_the_open():
+    exit = _simulate([ENTRY, (60, 65, 55, 58)], stop_loss=0.25)
+    assert exit['Exit Price'] == 60
+    assert exit['MAE'] == -40
+
+def test_target():
+    exit = _simulate([ENTRY, (100, 120, 95, 118), (118, 170, 90, 165)], target=0.5, stop_loss=0.25)
+    assert exit['Exit Reason'] == "target"
+    assert exit['Exit Price'] == 150
+    # The target candle counts only up to the target, its low before it
+    assert exit['MFE'] == 50
+    assert exit['MAE'] == -10
+
+def test_candle_reaching_stop_and_target_is_stopped_out():
+    exit = _simulate([ENTRY, (100, 160, 70, 120)], target=0.5, stop_loss=0.25)
+    assert exit['Exit Reason'] == "stop_loss"
+    assert exit['Exit Price'] == 75
+    assert exit['MFE'] == 0
+
+def test_trailing_stop():
+    exit = _simulate([ENTRY, (100, 110, 98, 108), (108, 120, 105, 118), (118, 119, 100, 101)], trailing_stop=0.1)
+    assert exit['Exit Reason'] == "trailing_stop"
+    assert exit['Exit Price'] == pytest.approx(108)
+    assert exit['MFE'] == 20
+
+def test_trailing_stop_below_the_fixed_stop_is_a_stop_loss():
+    exit = _simulate([ENTRY, (100, 101, 70, 72)], trailing_stop=0.5, stop_loss=0.25)
+    assert exit['Exit Reason'] == "stop_loss"
+
+def test_square_off_at_the_square_off_candle():
+    candles = [ENTRY] + [(100, 104, 97, 101 + i) for i in range(10)]
+    exit = _simulate(candles, start="2024-08-21 14:50")
+    assert exit['Exit Reason'] == "square_off"
+    assert exit['Exit Time'] == pd.Timestamp("2024-08-21 15:15", tz="Asia/Kolkata")
+    assert exit['Exit Price'] == 105
+
+def test_square_off_at_the_last_candle_of_the_session():
+    exit = _simulate([ENTRY, (100, 104, 97, 101), (101, 104, 97, 103)])
+    assert exit['Exit Reason'] == "square_off"
+    assert exit['Exit Price'] == 103
+    assert exit['MFE'] == 4
+    assert exit['MAE'] == -3
+
+def test_max_bars():
+    exit = _simulate([ENTRY, (100, 104, 97, 101), (101, 104, 97, 103), (103, 106, 99, 105)], max_bars=2)
+    assert exit['Exit Reason'] == "max_bars"
+    assert exit['Bars Held'] == 2
+    assert exit['Exit Price'] == 103
+
+def test_entry_on_the_last_candle_exits_flat():
+    exit = _simulate([ENTRY], start="2024-08-21 15:25")
+    assert exit['Bars Held'] == 0
+    assert exit['P&L'] == 0
+
+def test_exit_stats():
+    results = pd.DataFrame({
+        'Exit Time': pd.date_range("2024-08-21 10:00", periods=4, freq="h"),
+        'P&L': [10.0, -5.0, -10.0, 20.0],
+        'MAE': [-1.0, -5.0, -10.0, -2.0],
+        'MFE': [10.0, 1.0, 0.0, 20.0],
+    })
+    stats = exit_stats(results)
+    assert stats['Trades'] == 4
+    assert stats['Hit Rate %'] == 50
+    assert stats['Expectancy'] == 3.75
+    assert stats['Max Drawdown'] == -15
+    assert stats['Profit Factor'] == 2
+    assert np.isinf(exit_stats(results.iloc[[0]])['Profit Factor'])
@@ -0,0 +1,22 @@
+import os
+import sys
+import subprocess
+from api.breeze.candle_cache import CandleCache
+from strategies.stochastic import historic_data
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_import_creates_no_cache(tmp_path):
+    subprocess.run(
+        [sys.executable, "-c", "import strategies.stochastic.historic_data, strategies.stochastic.stochastic"],
+        cwd=tmp_path, env={**os.environ, 'PYTHONPATH': REPO}, check=True
+    )
+    assert list(tmp_path.iterdir()) == []
+
+def test_candle_cache_can_be_pointed_elsewhere(tmp_path):
+    cache = CandleCache(str(tmp_path / "candles.sqlite"))
+    previous = historic_data.set_candle_cache(cache)
+    try:
+        assert historic_data.get_candle_cache() is cache
+    finally:
+        historic_data.set_candle_cache(previous)
@@ -0,0 +1,33 @@
+import os
+import time
+from datetime import datetime, timedelta
+import pytz
+from strategies.stochastic.live import CandleAggregator, candle_bucket_start, exchange_now
+
+def test_exchange_now_ignores_the_host_timezone(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        now = exchange_now()
+        expected = datetime.now(pytz.timezone("Asia/Kolkata")).replace(tzinfo=None)
+        assert now.tzinfo is None
+        assert abs(expected - now) < timedelta(seconds=5)
+        # New York is at least 9.5 hours behind, a host-local clock would be far off
+        assert abs(datetime.now() - now) > timedelta(hours=9)
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
+
+def test_candles_are_bucketed_from_the_session_open():
+    interval = timedelta(minutes=5)
+    assert candle_bucket_start(datetime(2024, 8, 21, 9, 2), interval) == datetime(2024, 8, 21, 9, 15)
+    assert candle_bucket_start(datetime(2024, 8, 21, 10, 4, 59), interval) == datetime(2024, 8, 21, 10, 0)
+
+    aggregator = CandleAggregator()
+    for price, ttq in ((100, 10), (104, 15), (98, 40)):
+        aggregator.update({'ltt': "Wed Aug 21 10:01:30 2024", 'last': price, 'ttq': ttq})
+    # The first tick has no earlier day total to take its volume from, the rest add the difference
+    assert aggregator.close() == {
+        'datetime': "2024-08-21 10:00:00", 'open': 100.0, 'high': 104.0, 'low': 98.0, 'close': 98.0,
+        'volume': 30, 'expiry_date': None,
+    }
@@ -0,0 +1,71 @@
+import pandas as pd
+from strategies.stochastic.option_cache import OptionHistoryCache, frame_bytes
+from strategies.stochastic.stochastic import prefetch_options_history
+
+# 2024-08-21 10:00 IST
+NOW = 1724214600.0
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def _frame(expiry="28-Aug-2024", rows=50):
+    return pd.DataFrame({'close': [100.0] * rows, 'expiry_date': [expiry] * rows})
+
+FRAME_BYTES = frame_bytes(_frame())
+
+def test_least_recently_used_frame_is_evicted():
+    cache = OptionHistoryCache(max_bytes=2 * FRAME_BYTES, clock=Clock())
+    cache["51000-Call"] = _frame()
+    cache["51100-Call"] = _frame()
+    assert "51000-Call" in cache
+    cache["51200-Call"] = _frame()
+    assert set(cache) == {"51000-Call", "51200-Call"}
+    assert cache.stats()['evictions'] == 1
+
+def test_contracts_are_purged_the_day_after_expiry():
+    clock = Clock()
+    # No refresh period, so only the expiry drops frames
+    cache = OptionHistoryCache(refresh_seconds=0, clock=clock)
+    cache["51000-Call"] = _frame(expiry="21-Aug-2024")
+    cache["51000-Put"] = _frame(expiry="28-Aug-2024")
+    assert "51000-Call" in cache
+    # Still the expiry day at 15:25
+    clock.now = NOW + 5.4 * 3600
+    assert "51000-Call" in cache
+    clock.now = NOW + 24 * 3600
+    assert "51000-Call" not in cache
+    assert set(cache) == {"51000-Put"}
+    assert cache.stats()['expired'] == 1
+
+def test_frame_from_an_earlier_refresh_period_is_stale():
+    clock = Clock()
+    cache = OptionHistoryCache(refresh_seconds=300, clock=clock)
+    cache["51000-Call"] = _frame()
+    assert "51000-Call" in cache
+    clock.now += 300
+    assert "51000-Call" not in cache
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stale'], stats['entries']) == (1, 1, 1, 0)
+
+def test_pinned_frames_are_not_evicted():
+    cache = OptionHistoryCache(max_bytes=2 * FRAME_BYTES, clock=Clock())
+    cache["50000-Call"] = _frame()
+    planned = [(51000 + 100 * i, 'Call') for i in range(4)]
+    keys = [f"{strike_price}-{option_type}" for strike_price, option_type in planned]
+    with cache.pinned(keys):
+        prefetch_options_history(planned, cache, max_workers=2, fetch_options_history=lambda *option: _frame())
+        # Over budget, but everything this cycle fetched is still there
+        assert all(cache.get(key) is not None for key in keys)
+        assert "50000-Call" not in set(cache)
+    cache["52000-Call"] = _frame()
+    assert len(cache) == 2
+
+def test_unpinned_prefetch_over_budget_evicts_its_own_frames():
+    cache = OptionHistoryCache(max_bytes=2 * FRAME_BYTES, clock=Clock())
+    planned = [(51000 + 100 * i, 'Call') for i in range(4)]
+    prefetch_options_history(planned, cache, max_workers=1, fetch_options_history=lambda *option: _frame())
+    assert len(cache) == 2
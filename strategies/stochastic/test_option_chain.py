@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from strategies.stochastic.option_chain import OptionChain, RIGHTS, ladder_strikes
+from strategies.stochastic.stochastic import (
+    calculate_vwap, check_vwap_condition, evaluate_signals, evaluate_signals_chain, evaluate_signals_vectorized,
+    plan_option_fetches
+)
+
+BARS = 3000
+
+def _candles(rng, times, start_price, drift=0.0):
+    close = np.abs(start_price + np.cumsum(rng.normal(drift, 15, len(times)))) + 1
+    spread = rng.uniform(0.5, 12, len(times))
+    return pd.DataFrame({
+        'datetime': times,
+        'open': close + rng.normal(0, 4, len(times)),
+        'high': close + spread,
+        'low': np.maximum(close - spread, 0.05),
+        'close': close,
+        'volume': rng.integers(50, 5000, len(times)),
+    })
+
+def _market(seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2024-08-01 09:15", periods=BARS, freq="5min").strftime("%Y-%m-%d %H:%M:%S")
+    futures_df = calculate_vwap(_candles(rng, times, 51000, 0.3))
+    options = {}
+    for strike_price in ladder_strikes(futures_df['close'].to_numpy(), 100, 2).tolist():
+        for option_type in RIGHTS:
+            option_df = _candles(rng, times, 300, 0)
+            # Some contracts miss bars, one prints a bar twice
+            option_df = option_df.drop(index=rng.choice(BARS, 40, replace=False)).reset_index(drop=True)
+            if strike_price % 500 == 0:
+                option_df = pd.concat([option_df, option_df.iloc[[100]]]).sort_values('datetime', kind='stable')
+            option_df['expiry_date'] = "2024-08-28T06:00:00.000Z"
+            options[f"{strike_price}-{option_type}"] = option_df.reset_index(drop=True)
+    return futures_df, options
+
+def _copies(options):
+    # The DataFrame evaluators add indicator columns to the frames they are given
+    return {key: option_df.copy() for key, option_df in options.items()}
+
+def test_chain_matches_the_per_bar_loop():
+    futures_df, options = _market()
+    above_vwap, below_vwap = check_vwap_condition(futures_df)
+
+    loop_df, loop_flag = evaluate_signals(futures_df, above_vwap, below_vwap, _copies(options))
+    assert len(loop_df) > 50
+
+    vectorized_df, vectorized_flag = evaluate_signals_vectorized(futures_df, above_vwap, below_vwap, _copies(options))
+    pd.testing.assert_frame_equal(vectorized_df, loop_df, check_dtype=False)
+    assert vectorized_flag == loop_flag
+
+    planned = [f"{strike}-{right}" for strike, right in plan_option_fetches(futures_df, above_vwap, below_vwap)]
+    for chain_options in (options, {key: options[key] for key in planned}):
+        chain_df, chain_flag = evaluate_signals_chain(futures_df, above_vwap, below_vwap, OptionChain(chain_options))
+        pd.testing.assert_frame_equal(chain_df, loop_df, check_dtype=False)
+        assert chain_flag == loop_flag
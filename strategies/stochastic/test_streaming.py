@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from ta.momentum import StochasticOscillator
+from strategies.stochastic import indicators
+from strategies.stochastic.streaming import StreamingIndicators
+
+def _random_candles(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 51000 + np.cumsum(rng.normal(0, 20, rows))
+    spread = rng.uniform(1, 15, rows)
+    return pd.DataFrame({
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.integers(0, 5000, rows),
+    })
+
+def _with_gaps(df):
+    # Missing prices, as a broken candle from the API would give
+    df = df.copy()
+    df.loc[[3, 40, 41, 120], 'close'] = np.nan
+    df.loc[[7, 41, 200], 'high'] = np.nan
+    df.loc[[8, 300], 'low'] = np.nan
+    return df
+
+def _with_flat_windows(df):
+    # Runs of identical candles, where the stochastic range is zero
+    df = df.copy()
+    for start in (0, 50, 51, 300):
+        df.loc[start:start + 9, ['high', 'low', 'close']] = 51000.0
+    return df
+
+def _streaming(df):
+    indicators_ = StreamingIndicators()
+    rows = [indicators_.update(candle) for candle in df.to_dict('records')]
+    return pd.DataFrame(rows)
+
+def _batch(df):
+    high, low, close = (df[column].to_numpy(dtype=float) for column in ('high', 'low', 'close'))
+    vwap = indicators.vwap(close, df['volume'].to_numpy(dtype=float))
+    k, d = indicators.stochastic(high, low, close)
+    above_vwap, below_vwap = indicators.vwap_runs(close, vwap)
+    return pd.DataFrame({'VWAP': vwap, '%K': k, '%D': d, 'above_vwap': above_vwap, 'below_vwap': below_vwap})
+
+def _reference(df):
+    # The pandas and ta formulas the strategy used before the NumPy and streaming kernels
+    stoch = StochasticOscillator(df['high'], df['low'], df['close'], 5, 3)
+    vwap = (df['volume'] * df['close']).cumsum() / df['volume'].cumsum()
+    return pd.DataFrame({
+        'VWAP': vwap,
+        '%K': stoch.stoch(),
+        '%D': stoch.stoch_signal(),
+        'above_vwap': (df['close'] > vwap).rolling(window=6).sum() == 6,
+        'below_vwap': (df['close'] < vwap).rolling(window=6).sum() == 6,
+    })
+
+def _assert_parity(df):
+    streaming, batch, reference = _streaming(df), _batch(df), _reference(df)
+    for column in ('VWAP', '%K', '%D'):
+        np.testing.assert_allclose(streaming[column], reference[column], rtol=1e-12, equal_nan=True, err_msg=column)
+        np.testing.assert_allclose(batch[column], reference[column], rtol=1e-12, equal_nan=True, err_msg=column)
+    for column in ('above_vwap', 'below_vwap'):
+        np.testing.assert_array_equal(streaming[column], reference[column].to_numpy(), err_msg=column)
+        np.testing.assert_array_equal(batch[column], reference[column].to_numpy(), err_msg=column)
+
+def test_parity_on_random_candles():
+    for seed in range(3):
+        _assert_parity(_random_candles(seed=seed))
+
+def test_parity_with_missing_prices():
+    _assert_parity(_with_gaps(_random_candles()))
+
+def test_parity_on_flat_windows():
+    df = _with_flat_windows(_random_candles())
+    _assert_parity(df)
+    # A zero range gives no %K rather than a division error
+    assert _streaming(df)['%K'].iloc[4:10].isna().all()
+
+def test_parity_with_leading_zero_volume():
+    df = _random_candles()
+    df.loc[:4, 'volume'] = 0
+    _assert_parity(df)
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+from strategies.stochastic.stochastic import run_strategy
+from strategies.stochastic.sweep import DEFAULT_PARAMETERS, SweepData, parameter_grid, parse_grid, run_sweep
+from strategies.stochastic.test_option_chain import _copies, _market
+
+def _strategy_trades(futures_df, options):
+    trade_log = run_strategy(
+        fetch_futures_history=lambda: futures_df.copy(),
+        fetch_options_history=lambda strike_price, option_type: options[f"{strike_price}-{option_type}"].copy(),
+        option_cache={}, show_trades=False,
+    )
+    return trade_log.to_frame()
+
+def test_default_combination_takes_the_same_trades_as_run_strategy():
+    futures_df, options = _market()
+    expected = _strategy_trades(futures_df[['datetime', 'open', 'high', 'low', 'close', 'volume']], options)
+    assert len(expected) > 50
+
+    combinations = parameter_grid({'k_period': [5, 9], 'vwap_window': [4, 6]})
+    assert DEFAULT_PARAMETERS in combinations
+    results = run_sweep(combinations, futures_df, _copies(options), processes=1)
+    default_row = results[(results['k_period'] == 5) & (results['vwap_window'] == 6)]
+    assert default_row['trades'].tolist() == [len(expected)]
+    assert results['trades'].nunique() > 1
+
+    trades = SweepData(futures_df, _copies(options), {6}).trades(DEFAULT_PARAMETERS)
+    pd.testing.assert_frame_equal(
+        trades[['Timestamp', 'Option Type', 'Strike Price']],
+        expected[['Timestamp', 'Option Type', 'Strike Price']],
+        check_dtype=False,
+    )
+
+def test_parse_grid():
+    assert parse_grid(["k_period=5,9", "vwap_window=6"]) == {'k_period': [5, 9], 'vwap_window': [6]}
+    for spec in ("k_period", "k_period=", "period=5"):
+        with pytest.raises(ValueError):
+            parse_grid([spec])
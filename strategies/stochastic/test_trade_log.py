@@ -0,0 +1,54 @@
+import pandas as pd
+from strategies.stochastic.trade_log import TradeLog
+
+def _trades(n, start=0):
+    return pd.DataFrame({
+        'Timestamp': [f"2024-08-21 09:{15 + (start + i) % 45:02d}:00" for i in range(n)],
+        'Option Type': ['Call' if (start + i) % 3 else 'Put' for i in range(n)],
+        'Strike Price': [51000 + 100 * ((start + i) % 5) for i in range(n)],
+        '%K': [float('nan') if (start + i) % 7 == 0 else float((start + i) % 70) for i in range(n)],
+        '%D': [float((start + i) % 60) for i in range(n)],
+    })
+
+def _frame_summary(frame):
+    return frame.assign(Timestamp=frame['Timestamp'].astype(str)).groupby('Option Type').agg(
+        Trades=('Option Type', 'size'),
+        First=('Timestamp', 'min'),
+        Last=('Timestamp', 'max'),
+        Mean_K=('%K', 'mean'),
+        Mean_D=('%D', 'mean'),
+    )
+
+def test_rows_read_across_segments_and_pending(tmp_path):
+    trade_log = TradeLog(str(tmp_path), flush_rows=10)
+    for start in range(0, 45, 9):
+        trade_log.extend(_trades(9, start))
+    assert len(trade_log.segments) == 2
+    everything = trade_log.to_frame()
+    for start, stop in [(0, 5), (8, 23), (35, 45), (40, 60), (44, 45)]:
+        expected = everything.iloc[start:stop].reset_index(drop=True)
+        pd.testing.assert_frame_equal(trade_log.rows(start, stop), expected, check_dtype=False)
+
+def test_summary_matches_groupby(tmp_path):
+    trade_log = TradeLog(str(tmp_path), flush_rows=10)
+    trade_log.extend(_trades(25))
+    for trade in _trades(6, 25).to_dict('records'):
+        trade_log.append(trade)
+    pd.testing.assert_frame_equal(trade_log.summary(), _frame_summary(trade_log.to_frame()), check_dtype=False)
+
+def test_pending_trades_are_written_on_close(tmp_path):
+    trade_log = TradeLog(str(tmp_path), flush_rows=10)
+    trade_log.extend(_trades(4))
+    assert trade_log.segments == []
+    trade_log.close()
+    assert len(trade_log.segments) == 1
+    assert len(trade_log.to_frame()) == 4
+
+def test_from_frame_stays_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setenv('TRADE_LOG_DIR', str(tmp_path / "trades"))
+    frame = _trades(12)
+    trade_log = TradeLog.from_frame(frame)
+    trade_log.close()
+    assert trade_log.segments == []
+    assert not (tmp_path / "trades").exists()
+    pd.testing.assert_frame_equal(trade_log.summary(), _frame_summary(frame), check_dtype=False)
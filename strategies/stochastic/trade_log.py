@@ -0,0 +1,149 @@
+import os
+import math
+import uuid
+import logging
+from datetime import datetime
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+TRADE_COLUMNS = [
+    'Timestamp', 'Futures Price', 'VWAP', 'Option Type', 'Strike Price',
+    'Expiry', 'Option OHLC', '%K', '%D', 'Open', 'Close'
+]
+# Pending trades are written out as a new segment once there are this many
+FLUSH_ROWS = 1000
+
+class TradeLog:
+    """
+    Append-only trade log. Trades are held column by column in plain lists
+    (appending is amortized O(1), no DataFrame copy per trade) and, when a
+    directory is given, written out in CSV segments of flush_rows trades so
+    a long run doesn't keep them all in memory. Each log writes its own
+    segment names, so several runs can share a directory.
+
+    Per option type counts, first/last timestamps and %K/%D sums are kept
+    as trades come in, so the summary never reads the segments back, and
+    a page of trades only reads the segments it overlaps.
+    """
+
+    def __init__(self, directory=None, flush_rows=FLUSH_ROWS):
+        self.directory = directory if directory is not None else os.getenv('TRADE_LOG_DIR')
+        self.flush_rows = flush_rows
+        self.segments = []
+        self._segment_rows = []
+        # Option type -> [trades, first, last, %K sum, %K count, %D sum, %D count]
+        self._aggregates = {}
+        self._prefix = f"trades-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self._flushed_rows = 0
+        self._reset_pending()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_frame(cls, trades_df):
+        """An in-memory log (never written out, whatever TRADE_LOG_DIR says) holding the trades in trades_df."""
+        trade_log = cls(directory="")
+        trade_log.extend(trades_df)
+        return trade_log
+
+    def _reset_pending(self):
+        self._pending = {column: [] for column in TRADE_COLUMNS}
+        self._pending_rows = 0
+
+    def __len__(self):
+        return self._flushed_rows + self._pending_rows
+
+    def append(self, trade):
+        for column in TRADE_COLUMNS:
+            self._pending[column].append(trade.get(column))
+        self._pending_rows += 1
+        self._aggregate([trade.get('Option Type')], [trade.get('Timestamp')], [trade.get('%K')], [trade.get('%D')])
+        self._flush_if_full()
+
+    def extend(self, trades_df):
+        if trades_df is None or trades_df.empty:
+            return
+        rows = len(trades_df)
+        for column in TRADE_COLUMNS:
+            self._pending[column].extend(trades_df[column].tolist() if column in trades_df else [None] * rows)
+        self._pending_rows += rows
+        self._aggregate(*(self._pending[column][-rows:] for column in ('Option Type', 'Timestamp', '%K', '%D')))
+        self._flush_if_full()
+
+    def _aggregate(self, option_types, timestamps, ks, ds):
+        for option_type, timestamp, k, d in zip(option_types, timestamps, ks, ds):
+            if option_type is None or option_type != option_type:
+                continue
+            # Timestamps as text so flushed (read back) and pending trades compare alike
+            timestamp = str(timestamp)
+            aggregate = self._aggregates.get(option_type)
+            if aggregate is None:
+                aggregate = self._aggregates[option_type] = [0, timestamp, timestamp, 0.0, 0, 0.0, 0]
+            aggregate[0] += 1
+            aggregate[1] = min(aggregate[1], timestamp)
+            aggregate[2] = max(aggregate[2], timestamp)
+            # Missing values are skipped like pandas' mean does
+            if k is not None and not math.isnan(k):
+                aggregate[3] += k
+                aggregate[4] += 1
+            if d is not None and not math.isnan(d):
+                aggregate[5] += d
+                aggregate[6] += 1
+
+    def _flush_if_full(self):
+        if self.directory and self._pending_rows >= self.flush_rows:
+            self.flush()
+
+    def _pending_frame(self):
+        return pd.DataFrame(self._pending, columns=TRADE_COLUMNS)
+
+    def flush(self):
+        """Write the pending trades out as a new segment. Without a directory they stay in memory."""
+        if not self.directory or not self._pending_rows:
+            return
+        path = os.path.join(self.directory, f"{self._prefix}-{len(self.segments):05d}.csv")
+        self._pending_frame().to_csv(path, index=False)
+        self.segments.append(path)
+        self._segment_rows.append(self._pending_rows)
+        self._flushed_rows += self._pending_rows
+        log.debug(f"Wrote {self._pending_rows} trades to {path}")
+        self._reset_pending()
+
+    def close(self):
+        """Write out whatever is still pending, call once the run is over."""
+        self.flush()
+
+    def rows(self, start, stop):
+        """Trades start to stop (exclusive), reading only the segments in that range."""
+        start, stop = max(start, 0), min(stop, len(self))
+        frames = []
+        offset = 0
+        for path, rows in zip(self.segments, self._segment_rows):
+            if offset < stop and offset + rows > start:
+                frames.append(pd.read_csv(path).iloc[max(start - offset, 0):stop - offset])
+            offset += rows
+        if stop > self._flushed_rows:
+            frames.append(self._pending_frame().iloc[max(start - self._flushed_rows, 0):stop - self._flushed_rows])
+        if not frames:
+            return self._pending_frame().iloc[0:0]
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+
+    def summary(self):
+        """Per option type trades, first and last timestamp and mean %K/%D, from the running aggregates."""
+        summary = pd.DataFrame(
+            [
+                (option_type, trades, first, last,
+                 k_sum / k_count if k_count else float('nan'), d_sum / d_count if d_count else float('nan'))
+                for option_type, (trades, first, last, k_sum, k_count, d_sum, d_count) in self._aggregates.items()
+            ],
+            columns=['Option Type', 'Trades', 'First', 'Last', 'Mean_K', 'Mean_D'],
+        )
+        return summary.set_index('Option Type').sort_index()
+
+    def to_frame(self):
+        """Every trade so far, flushed segments first, as one DataFrame."""
+        frames = [pd.read_csv(path) for path in self.segments]
+        if self._pending_rows or not frames:
+            frames.append(self._pending_frame())
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
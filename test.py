@@ -1,13 +1,8 @@
 ﻿import pandas as pd
 import numpy as np
 import requests
-import smtplib
-from email.mime.text import MIMEText
-from ta import add_all_ta_features
-from ta.volume import VolumeWeightedAveragePrice
-from ta.momentum import StochasticOscillator
-import schedule
-import time
+from api.alerts import send_alert
+from strategies.stochastic import indicators
 from dotenv import load_dotenv
 import os
 
@@ -95,14 +90,15 @@ def calculate_indicators(df):
     if not all(col in df.columns for col in required_columns):
         raise ValueError(f"Missing required columns. Expected: {required_columns}")
 
-    # Calculate VWAP
-    vwap = VolumeWeightedAveragePrice(high=df['high'], low=df['low'], close=df['close'], volume=df['volume'], window=14)
-    df['VWAP'] = vwap.volume_weighted_average_price()
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+
+    # Calculate VWAP (same as ta's VolumeWeightedAveragePrice with window=14)
+    df['VWAP'] = indicators.rolling_vwap(high, low, close, df['volume'].to_numpy(dtype=float), window=14)
 
     # Calculate Stochastic Oscillator
-    stoch = StochasticOscillator(high=df['high'], low=df['low'], close=df['close'], window=5, smooth_window=3)
-    df['%K'] = stoch.stoch()
-    df['%D'] = stoch.stoch_signal()
+    df['%K'], df['%D'] = indicators.stochastic(high, low, close, k_period=5, d_period=3)
 
     return df
 
@@ -121,19 +117,8 @@ def check_conditions(futures_df, options_df):
     return price_above_vwap and stoch_crossover and below_upper_band
 
 def send_email(subject, body):
-    # Function to send email alerts
-    sender = "your_email@gmail.com"
-    recipient = "recipient@example.com"
-    password = "your_email_password"
-
-    msg = MIMEText(body)
-    msg['Subject'] = subject
-    msg['From'] = sender
-    msg['To'] = recipient
-
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp_server:
-        smtp_server.login(sender, password)
-        smtp_server.sendmail(sender, recipient, msg.as_string())
+    # Function to send email alerts, queued and sent in the background
+    send_alert(subject, body)
 
 
 def main():
@@ -166,9 +151,13 @@ def main():
 if __name__ == "__main__":
     BREEZE_API_KEY = os.getenv("BREEZE_API_KEY")
     print(f"{BREEZE_API_KEY = }")
-    # # Run the script every 5 minutes
-    # schedule.every(5).minutes.do(main)
-
-    # while True:
-    #     schedule.run_pending()
-    #     time.sleep(1)
+    # Evaluate on every 5 minute candle close from the Breeze tick feed instead of
+    # polling the full history every 5 minutes. Set TICK_REPLAY_ADDRESS=host:port
+    # to stream ticks from a local TickReplayServer instead.
+    from strategies.stochastic.live import run_live
+    replay_address = os.getenv("TICK_REPLAY_ADDRESS")
+    if replay_address:
+        host, port = replay_address.rsplit(":", 1)
+        run_live(replay_address=(host, int(port)))
+    else:
+        run_live(record_path=os.getenv("TICK_RECORD_PATH"))
\ No newline at end of file